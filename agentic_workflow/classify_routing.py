@@ -1,25 +1,47 @@
-from langchain.schema import HumanMessage
-from common.types import GraphState
+import sys
+from pathlib import Path
+from typing import get_args
+
+from common.types import GithubIntent, GraphState, RouteDecision
 from common.llm import llm
 
-def route(state: GraphState) -> str:
-    last_user_msg = state["messages"][-1].content
-    system_prompt = (
-        "You are a routing assistant. Classify the user's message as either:\n"
-        "- 'github_agent': if it is about repositories, pull requests, GitHub-related tasks\n"
-        "- 'chat_agent': for anything else (general conversation, non-GitHub questions)\n"
-        "Respond with only the label: 'github_agent' or 'chat_agent'."
-    )
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.batching import BatchClassifier
+
+# One label per route/intent pair, so a single structured call decides both and a
+# GitHub question does not need a second classification call in github_agent
+DECISIONS = {
+    "chat_agent": RouteDecision(route="chat_agent"),
+    **{f"github_agent:{intent}": RouteDecision(route="github_agent", github_intent=intent)
+       for intent in get_args(GithubIntent)},
+}
+
+# With LLM_BATCH_WINDOW set, messages from concurrent conversations that arrive
+# within the window are routed with a single structured call; off by default
+router = BatchClassifier(
+    llm,
+    list(DECISIONS),
+    "You are a routing assistant. Classify each user message with one label:\n"
+    "- 'github_agent:list_repos': the user wants a list of their GitHub repositories\n"
+    "- 'github_agent:count_commits': the user wants to know how many commits they made\n"
+    "- 'github_agent:count_prs': the user wants to know how many pull requests they opened\n"
+    "- 'github_agent:general_question': any other question about repositories, pull requests "
+    "or GitHub-related tasks\n"
+    "- 'chat_agent': for anything else (general conversation, non-GitHub questions)",
+    default="chat_agent",
+)
+route_batcher = router.batcher()
 
+
+def classify_route(state: GraphState) -> dict:
+    last_user_msg = state["messages"][-1].content
     try:
-        classification = llm.invoke([
-            HumanMessage(content=system_prompt),
-            HumanMessage(content=last_user_msg)
-        ])
-        route_decision = classification.content.strip().lower()
-        if route_decision not in ["github_agent", "chat_agent"]:
-            route_decision = "chat_agent"
-        return route_decision
+        decision = DECISIONS[route_batcher.submit(last_user_msg)]
     except Exception as e:
         print(f"⚠️ Routing failed: {e}. Defaulting to 'chat_agent'")
-        return "chat_agent"
\ No newline at end of file
+        decision = DECISIONS["chat_agent"]
+    return decision.model_dump()
+
+
+def route(state: GraphState) -> str:
+    return state.get("route") or "chat_agent"
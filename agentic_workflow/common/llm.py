@@ -1,10 +1,12 @@
-from langchain_openai import ChatOpenAI
-import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables from .env before shared.clients reads its settings
+load_dotenv()
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from shared.clients import chat_model
 
 # Use OpenAI API key from environment variables
-llm = ChatOpenAI(
-    model="deepseek-chat",  
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
\ No newline at end of file
+llm = chat_model("deepseek-chat", temperature=0.0)
\ No newline at end of file
@@ -11,7 +11,8 @@ def summarize_conversation(messages: List[BaseMessage]) -> str:
         "Summarize in 2-3 sentences."
     )
     try:
-        response = llm.invoke([HumanMessage(content=summary_prompt)])
+        response = llm.invoke([HumanMessage(content=summary_prompt)],
+                              config={"run_name": "summarize_conversation"})
         return response.content
     except Exception as e:
         return f"⚠️ Failed to summarize conversation: {e}"
\ No newline at end of file
@@ -1,7 +1,21 @@
-from typing import Annotated
+from typing import Annotated, Literal, Optional
 from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
+from pydantic import BaseModel, Field
+
+Route = Literal["github_agent", "chat_agent"]
+GithubIntent = Literal["list_repos", "count_commits", "count_prs", "general_question"]
+
+
+class RouteDecision(BaseModel):
+    """Where a message goes and, for GitHub messages, what the user wants."""
+    route: Route = Field(description="Agent that handles the message.")
+    github_intent: Optional[GithubIntent] = Field(
+        default=None, description="GitHub request type; only set when route is github_agent.")
+
 
 class GraphState(TypedDict):
-    messages: Annotated[list[BaseMessage], add_messages]
\ No newline at end of file
+    messages: Annotated[list[BaseMessage], add_messages]
+    route: Optional[Route]
+    github_intent: Optional[GithubIntent]
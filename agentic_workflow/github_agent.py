@@ -1,66 +1,75 @@
 import os
 import requests
-from langchain.schema import AIMessage, HumanMessage
+from langchain.schema import AIMessage
 from common.types import GraphState
 from common.llm import llm
+from github_cache import IntentCache
 
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
 GITHUB_API_URL = "https://api.github.com"
 
+# Answers to repeated questions within a session come from here without API calls;
+# type /refresh in the chat to drop them
+github_cache = IntentCache()
+
+
+def _profile(headers):
+    """Login and repositories of the token's user; shared by list_repos and count_commits."""
+    user_resp = requests.get(f"{GITHUB_API_URL}/user", headers=headers)
+    user_resp.raise_for_status()
+    username = user_resp.json()["login"]
+
+    repos_resp = requests.get(f"{GITHUB_API_URL}/users/{username}/repos", headers=headers)
+    repos_resp.raise_for_status()
+    return username, repos_resp.json()
+
+
+def _list_repos(headers):
+    username, repos = github_cache.get_or_compute(GITHUB_TOKEN, "profile", lambda: _profile(headers))
+    names = [repo["name"] for repo in repos]
+    return f"User {username} has the following repositories: {', '.join(names)}"
+
+
+def _count_commits(headers):
+    username, repos = github_cache.get_or_compute(GITHUB_TOKEN, "profile", lambda: _profile(headers))
+    total_commits = 0
+    for repo in repos:
+        commits_resp = requests.get(f"{GITHUB_API_URL}/repos/{username}/{repo['name']}/commits", headers=headers)
+        if commits_resp.status_code == 200:
+            commits = commits_resp.json()
+            user_commits = [commit for commit in commits if commit['author'] and commit['author']['login'] == username]
+            total_commits += len(user_commits)
+
+    return f"User {username} has made a total of {total_commits} commits across their repositories."
+
+
+def _count_prs(headers):
+    prs = requests.get(f"{GITHUB_API_URL}/search/issues?q=author:@me+type:pr", headers=headers)
+    prs.raise_for_status()
+    total_prs = prs.json().get("total_count", 0)
+    return f"You have opened {total_prs} pull requests."
+
+
+INTENT_HANDLERS = {
+    "list_repos": _list_repos,
+    "count_commits": _count_commits,
+    "count_prs": _count_prs,
+}
+
+
 def github_agent(state: GraphState) -> GraphState:
     user_msg = state["messages"][-1].content
     headers = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
 
-    try:
-        # Classify intent
-        system_prompt = (
-            "You are a classifier and helper for GitHub queries. "
-            "Classify the user's request as one of the following:\n"
-            "- 'list_repos'\n"
-            "- 'count_commits'\n"
-            "- 'count_prs'\n"
-            "- 'general_question'\n"
-            "Only output the label."
-        )
-        intent = llm.invoke([HumanMessage(content=system_prompt), HumanMessage(content=user_msg)]).content.strip()
-    except Exception as e:
-        return {"messages": state["messages"] + [AIMessage(content=f"Failed to classify GitHub intent: {e}")]}
+    # Decided together with the route in classify_routing, no extra LLM call here
+    intent = state.get("github_intent") or "general_question"
 
     response_text = "Sorry, I couldn't process your GitHub request."
 
     try:
-        if intent == "list_repos":
-            user_resp = requests.get(f"{GITHUB_API_URL}/user", headers=headers)
-            user_resp.raise_for_status()
-            username = user_resp.json()["login"]
-
-            repos_resp = requests.get(f"{GITHUB_API_URL}/users/{username}/repos", headers=headers)
-            repos_resp.raise_for_status()
-            repos = [repo["name"] for repo in repos_resp.json()]
-            response_text = f"User {username} has the following repositories: {', '.join(repos)}"
-
-        elif intent == "count_commits":
-            user_resp = requests.get(f"{GITHUB_API_URL}/user", headers=headers)
-            user_resp.raise_for_status()
-            username = user_resp.json()["login"]
-
-            repos_resp = requests.get(f"{GITHUB_API_URL}/users/{username}/repos", headers=headers)
-            repos_resp.raise_for_status()
-            total_commits = 0
-            for repo in repos_resp.json():
-                commits_resp = requests.get(f"{GITHUB_API_URL}/repos/{username}/{repo['name']}/commits", headers=headers)
-                if commits_resp.status_code == 200:
-                    commits = commits_resp.json()
-                    user_commits = [commit for commit in commits if commit['author'] and commit['author']['login'] == username]
-                    total_commits += len(user_commits)
-
-            response_text = f"User {username} has made a total of {total_commits} commits across their repositories."
-
-        elif intent == "count_prs":
-            prs = requests.get(f"{GITHUB_API_URL}/search/issues?q=author:@me+type:pr", headers=headers)
-            prs.raise_for_status()
-            total_prs = prs.json().get("total_count", 0)
-            response_text = f"You have opened {total_prs} pull requests."
+        handler = INTENT_HANDLERS.get(intent)
+        if handler is not None:
+            response_text = github_cache.get_or_compute(GITHUB_TOKEN, intent, lambda: handler(headers))
 
         elif intent == "general_question":
             response_text = llm.invoke(user_msg).content
@@ -68,4 +77,4 @@ def github_agent(state: GraphState) -> GraphState:
     except Exception as e:
         response_text = f"⚠️ Error processing GitHub request: {e}"
 
-    return {"messages": state["messages"] + [AIMessage(content=response_text)]}
\ No newline at end of file
+    return {"messages": state["messages"] + [AIMessage(content=response_text)]}
@@ -0,0 +1,76 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds an answer stays fresh, per intent; intents not listed are never cached.
+# "profile" is the login and repository list shared by list_repos and count_commits.
+INTENT_TTLS = {
+    "profile": 300,
+    "list_repos": 300,
+    "count_commits": 120,
+    "count_prs": 60,
+}
+
+
+def token_identity(token) -> str:
+    """Stable, non-reversible id for a GitHub token, so the raw token is never a cache key."""
+    return hashlib.sha256((token or "").encode()).hexdigest()[:16]
+
+
+class IntentCache:
+    """TTL cache of GitHub answers keyed by (token identity, intent).
+
+    Answers for different tokens never mix, each intent has its own TTL and
+    failed lookups are not cached. ``invalidate`` drops entries for a token, an
+    intent, or everything.
+    """
+
+    def __init__(self, ttls: dict = None, max_entries: int = 256):
+        self.ttls = dict(INTENT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (identity, intent) -> (expires at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, token, intent: str, compute):
+        ttl = self.ttls.get(intent)
+        if ttl is None:
+            return compute()
+        key = (token_identity(token), intent)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, token=None, intent: str = None) -> int:
+        """Drop matching entries (all of them with no arguments); returns how many."""
+        identity = token_identity(token) if token is not None else None
+        with self._lock:
+            keys = [key for key in self._entries
+                    if (identity is None or key[0] == identity)
+                    and (intent is None or key[1] == intent)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
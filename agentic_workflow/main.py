@@ -1,18 +1,24 @@
+from dotenv import load_dotenv
+
+# Load environment variables from .env before the agents (and shared.clients) read them
+load_dotenv()
+
 from common.types import GraphState
 from langgraph.graph import StateGraph
 
 from chat_agent import chat_agent
-from classify_routing import route
-from github_agent import github_agent
+from classify_routing import classify_route, route
+from github_agent import github_agent, github_cache
 from checkpointing import load_checkpoint, save_checkpoint
 
 from langchain_core.messages import HumanMessage
 
 import os
-from dotenv import load_dotenv
+import sys
+from pathlib import Path
 
-# Load environment variables from .env
-load_dotenv()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.accounting import account_run
 
 graph_builder = StateGraph(GraphState)
 
@@ -20,7 +26,7 @@ graph_builder = StateGraph(GraphState)
 builder = StateGraph(GraphState)
 builder.add_node("chat_agent", chat_agent)
 builder.add_node("github_agent", github_agent)
-builder.add_node("route", lambda x: x)
+builder.add_node("route", classify_route)
 
 builder.add_conditional_edges("route", route, {
     "chat_agent": "chat_agent",
@@ -37,6 +43,13 @@ except Exception as e:
     raise RuntimeError(f"❌ Failed to compile LangGraph: {e}")
 
 def run_chat():
+    # Per-node LLM calls, tokens and latency across every turn, printed on exit
+    with account_run() as accounting:
+        _chat_loop()
+    print("\n" + accounting.summary())
+
+
+def _chat_loop():
     try:
         thread_id = input("Enter chat ID (or press enter to start new): ").strip()
         if not thread_id:
@@ -54,6 +67,11 @@ def run_chat():
                 print(f"\n💾 Saved. Resume using ID: {thread_id}")
                 break
 
+            if user_input.strip() == "/refresh":
+                dropped = github_cache.invalidate()
+                print(f"🔄 Cleared {dropped} cached GitHub answers")
+                continue
+
             state["messages"].append(HumanMessage(content=user_input))
             try:
                 state = graph.invoke(state)
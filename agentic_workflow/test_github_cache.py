@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from github_cache import IntentCache, token_identity
+
+
+def test_answers_are_cached_per_token_and_intent():
+    cache = IntentCache(ttls={"list_repos": 60, "count_prs": 60})
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            return value
+        return run
+
+    assert cache.get_or_compute("token-a", "list_repos", compute("repos a")) == "repos a"
+    assert cache.get_or_compute("token-a", "list_repos", compute("again")) == "repos a"
+    assert cache.get_or_compute("token-b", "list_repos", compute("repos b")) == "repos b"
+    assert cache.get_or_compute("token-a", "count_prs", compute("3 prs")) == "3 prs"
+    # intents without a TTL are never cached
+    assert cache.get_or_compute("token-a", "general_question", compute("x")) == "x"
+    assert cache.get_or_compute("token-a", "general_question", compute("y")) == "y"
+
+    assert calls == ["repos a", "repos b", "3 prs", "x", "y"]
+    assert cache.stats()["hits"] == 1
+    assert token_identity("token-a") != token_identity("token-b")
+    assert "token-a" not in str(cache._entries)
+
+
+def test_entries_expire_and_failures_are_not_cached():
+    cache = IntentCache(ttls={"count_prs": 0.05})
+    assert cache.get_or_compute("t", "count_prs", lambda: 1) == 1
+    time.sleep(0.06)
+    assert cache.get_or_compute("t", "count_prs", lambda: 2) == 2
+
+    def fail():
+        raise RuntimeError("rate limited")
+
+    cache.invalidate()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("t", "count_prs", fail)
+    assert cache.get_or_compute("t", "count_prs", lambda: 3) == 3
+
+
+def test_invalidate_by_token_or_intent():
+    cache = IntentCache(ttls={"list_repos": 60, "count_prs": 60})
+    for token in ("a", "b"):
+        for intent in ("list_repos", "count_prs"):
+            cache.get_or_compute(token, intent, lambda: intent)
+
+    assert cache.invalidate(token="a", intent="count_prs") == 1
+    assert cache.invalidate(intent="list_repos") == 2
+    assert cache.invalidate(token="b") == 1
+    assert cache.stats()["entries"] == 0
@@ -1,5 +1,4 @@
 from typing import Annotated
-from langchain_openai import ChatOpenAI  # Add this import
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import BaseMessage
 from typing_extensions import TypedDict
@@ -7,12 +6,16 @@ from typing_extensions import TypedDict
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
-import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.clients import chat_model
+
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
@@ -23,12 +26,7 @@ graph_builder = StateGraph(State)
 
 search = TavilySearchResults(max_results=2)
 tools = [search]
-llm = ChatOpenAI(
-    model="deepseek-chat",  
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
+llm = chat_model("deepseek-chat", temperature=0.0)
 llm_with_tools = llm.bind_tools(tools)
 
 
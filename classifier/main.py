@@ -1,48 +1,134 @@
+import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-from typing import Annotated, Literal
+from typing import Annotated
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langchain.chat_models import init_chat_model
-from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
 load_dotenv()
 
-llm = init_chat_model(
-    "deepseek-chat"
-)
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.accounting import account_run
+from shared.batching import BatchClassifier
+from shared.clients import cache_for, http_clients
 
+from pre_classifier import DEFAULT_THRESHOLD, PreClassifier, log_decision
+from speculation import Speculator
 
-class MessageClassifier(BaseModel):
-    message_type: Literal["emotional", "logical"] = Field(
-        ...,
-        description="Classify if the message requires an emotional (therapist) or logical response."
-    )
+llm = init_chat_model(
+    "deepseek-chat",
+    **http_clients()
+)
+# Classification is deterministic so repeated messages can be answered from the response cache
+classifier_model = init_chat_model(
+    "deepseek-chat",
+    temperature=0.0,
+    cache=cache_for(0.0),
+    **http_clients()
+)
 
 
 class State(TypedDict):
     messages: Annotated[list, add_messages]
     message_type: str | None
+    # set when the classifier node already produced the reply speculatively
+    speculative_hit: bool | None
+
+
+# With LLM_BATCH_WINDOW set, concurrent sessions are classified together: messages
+# arriving within the window share one structured call that returns a label per
+# message. Off by default, the chat loop below is single-user
+classifier = BatchClassifier(
+    classifier_model,
+    ["emotional", "logical"],
+    """Classify each user message as either:
+    - 'emotional': if it asks for emotional support, therapy, deals with feelings, or personal problems
+    - 'logical': if it asks for facts, information, logical analysis, or practical solutions
+    """,
+    default="logical",
+)
+classify_batcher = classifier.batcher()
 
+# Opt-in: LLM decisions are logged here, and a local classifier fitted on the log
+# at startup answers confident messages without an LLM call
+DECISIONS_PATH = os.environ.get("CLASSIFIER_DECISIONS")
+pre_classifier = PreClassifier.from_log(
+    DECISIONS_PATH,
+    threshold=float(os.environ.get("CLASSIFIER_THRESHOLD", DEFAULT_THRESHOLD)),
+) if DECISIONS_PATH else None
 
-def classify_message(state: State):
-    last_message = state["messages"][-1]
-    classifier_llm = llm.with_structured_output(MessageClassifier)
 
-    result = classifier_llm.invoke([
-        {
-            "role": "system",
-            "content": """Classify the user message as either:
-            - 'emotional': if it asks for emotional support, therapy, deals with feelings, or personal problems
-            - 'logical': if it asks for facts, information, logical analysis, or practical solutions
-            """
-        },
-        {"role": "user", "content": last_message.content}
-    ])
-    return {"message_type": result.message_type}
+# Opt-in: start the likely reply while the LLM classifies, instead of after it
+speculator = Speculator(default="logical") if os.environ.get("CLASSIFIER_SPECULATE") else None
+
+THERAPIST_PROMPT = """You are a compassionate therapist. Focus on the emotional aspects of the user's message.
+                        Show empathy, validate their feelings, and help them process their emotions.
+                        Ask thoughtful questions to help them explore their feelings more deeply.
+                        Avoid giving logical solutions unless explicitly asked."""
+
+LOGICAL_PROMPT = """You are a purely logical assistant. Focus only on facts and information.
+            Provide clear, concise answers based on logic and evidence.
+            Do not address emotions or provide emotional support.
+            Be direct and straightforward in your responses."""
+
+REPLY_PROMPTS = {"emotional": THERAPIST_PROMPT, "logical": LOGICAL_PROMPT}
+
+
+def _reply_messages(system_prompt, text):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": text},
+    ]
+
+
+def _llm_label(text):
+    label = classify_batcher.submit(text)
+    if DECISIONS_PATH:
+        log_decision(DECISIONS_PATH, text, label)
+    return label
+
+
+def _speculative_reply(text, label, cancel):
+    """Stream the reply for ``label``; closing the stream early stops generation."""
+    parts = []
+    for chunk in llm.stream(_reply_messages(REPLY_PROMPTS[label], text)):
+        if cancel.is_set():
+            return None
+        parts.append(chunk.content)
+    return "".join(parts)
+
+
+def classify_message(state: State):
+    text = state["messages"][-1].content
+    hint = None
+    if pre_classifier is not None:
+        label = pre_classifier.classify(text)
+        if label is not None:
+            if speculator is not None:
+                speculator.record(label)
+            return {"message_type": label, "speculative_hit": False}
+        if speculator is not None:
+            # below the threshold the best local guess is still a better prior
+            hint, _ = pre_classifier.predict(text)
+    if speculator is None:
+        return {"message_type": _llm_label(text), "speculative_hit": False}
+
+    label, reply = speculator.run(
+        speculator.guess(hint),
+        lambda: _llm_label(text),
+        lambda guess, cancel: _speculative_reply(text, guess, cancel))
+    if reply is None:
+        return {"message_type": label, "speculative_hit": False}
+    return {"message_type": label, "speculative_hit": True,
+            "messages": [{"role": "assistant", "content": reply}]}
 
 
 def router(state: State):
+    if state.get("speculative_hit"):
+        return {"next": "done"}
     message_type = state.get("message_type", "logical")
     if message_type == "emotional":
         return {"next": "therapist"}
@@ -53,18 +139,7 @@ def router(state: State):
 def therapist_agent(state: State):
     last_message = state["messages"][-1]
 
-    messages = [
-        {"role": "system",
-         "content": """You are a compassionate therapist. Focus on the emotional aspects of the user's message.
-                        Show empathy, validate their feelings, and help them process their emotions.
-                        Ask thoughtful questions to help them explore their feelings more deeply.
-                        Avoid giving logical solutions unless explicitly asked."""
-         },
-        {
-            "role": "user",
-            "content": last_message.content
-        }
-    ]
+    messages = _reply_messages(THERAPIST_PROMPT, last_message.content)
     reply = llm.invoke(messages)
     return {"messages": [{"role": "assistant", "content": reply.content}]}
 
@@ -72,18 +147,7 @@ def therapist_agent(state: State):
 def logical_agent(state: State):
     last_message = state["messages"][-1]
 
-    messages = [
-        {"role": "system",
-         "content": """You are a purely logical assistant. Focus only on facts and information.
-            Provide clear, concise answers based on logic and evidence.
-            Do not address emotions or provide emotional support.
-            Be direct and straightforward in your responses."""
-         },
-        {
-            "role": "user",
-            "content": last_message.content
-        }
-    ]
+    messages = _reply_messages(LOGICAL_PROMPT, last_message.content)
     reply = llm.invoke(messages)
     return {"messages": [{"role": "assistant", "content": reply.content}]}
 
@@ -101,7 +165,7 @@ graph_builder.add_edge("classifier", "router")
 graph_builder.add_conditional_edges(
     "router",
     lambda state: state.get("next"),
-    {"therapist": "therapist", "logical": "logical"}
+    {"therapist": "therapist", "logical": "logical", "done": END}
 )
 
 graph_builder.add_edge("therapist", END)
@@ -111,6 +175,17 @@ graph = graph_builder.compile()
 
 
 def run_chatbot():
+    # Per-node LLM calls, tokens and latency for the session, printed on exit
+    with account_run() as accounting:
+        _chat_loop()
+    print(accounting.summary())
+    if pre_classifier is not None:
+        print(f"pre-classifier: {pre_classifier.stats()}")
+    if speculator is not None:
+        print(f"speculation: {speculator.stats()}")
+
+
+def _chat_loop():
     state = {"messages": [], "message_type": None}
 
     while True:
@@ -0,0 +1,230 @@
+"""Local TF-IDF kNN classifier trained from logged LLM decisions.
+
+Every message the LLM classifies can be appended to a decisions log
+(``log_decision``). ``PreClassifier`` is fitted on that log at startup and
+answers the messages it is confident about without a round trip; the rest
+still go to the LLM, whose answers grow the log for the next start.
+
+Examples are kept as an inverted index (for each feature, the examples that
+contain it and their weights), so memory grows with the number of non-zero
+weights rather than examples x vocabulary. Inference only touches the
+postings of the message's own features, well under a millisecond per message
+for logs of a few thousand decisions.
+
+Evaluate a log (held-out accuracy and coverage per threshold) with::
+
+    python pre_classifier.py decisions.jsonl
+"""
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.8
+# Fewer logged decisions than this and the pre-classifier stays off
+MIN_EXAMPLES = 20
+
+_WORD = re.compile(r"[a-z0-9']+")
+_CJK = re.compile(r"[一-鿿]+")
+_log_lock = threading.Lock()
+
+
+def features(text: str) -> list[str]:
+    """Words and word bigrams for Latin text, character uni/bigrams for Chinese."""
+    text = text.lower()
+    words = _WORD.findall(text)
+    feats = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for run in _CJK.findall(text):
+        feats += list(run) + [run[i:i + 2] for i in range(len(run) - 1)]
+    return feats
+
+
+def log_decision(path, text: str, label: str):
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"text": text, "label": label}, ensure_ascii=False) + "\n")
+
+
+def read_decisions(path) -> tuple[list[str], list[str]]:
+    texts, labels = [], []
+    if not Path(path).exists():
+        return texts, labels
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                texts.append(record["text"])
+                labels.append(record["label"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return texts, labels
+
+
+class PreClassifier:
+    """Cosine kNN over TF-IDF vectors of past decisions.
+
+    ``predict`` returns the similarity-weighted majority label among the ``k``
+    nearest examples and its share of the vote as the confidence; a message
+    with no example above ``min_similarity`` gets no label. ``classify``
+    applies ``threshold`` and keeps hit counts and latency.
+    """
+
+    def __init__(self, k: int = 7, min_similarity: float = 0.2,
+                 threshold: float = DEFAULT_THRESHOLD, max_features: int = 20000):
+        self.k = k
+        self.min_similarity = min_similarity
+        self.threshold = threshold
+        self.max_features = max_features
+        self.vocab = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        # inverted index: postings of feature i are rows/weights[indptr[i]:indptr[i + 1]]
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.examples = 0
+        self.classes = []
+        self.labels = np.zeros(0, dtype=np.int64)
+        self.answered = 0
+        self.deferred = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_log(cls, path, **kwargs):
+        """Fit on a decisions log; None when it has too few examples to trust."""
+        texts, labels = read_decisions(path)
+        if len(texts) < MIN_EXAMPLES or len(set(labels)) < 2:
+            return None
+        return cls(**kwargs).fit(texts, labels)
+
+    def fit(self, texts: list[str], labels: list[str]):
+        docs = [Counter(features(text)) for text in texts]
+        df = Counter(feat for doc in docs for feat in doc)
+        self.vocab = {feat: i for i, (feat, _) in enumerate(df.most_common(self.max_features))}
+        n = len(docs)
+        self.idf = np.array([math.log((1 + n) / (1 + df[feat])) + 1 for feat in self.vocab],
+                            dtype=np.float32)
+        feats, rows, weights = [], [], []
+        for row, doc in enumerate(docs):
+            idx, values = self._weights(doc)
+            feats.append(idx)
+            rows.append(np.full(len(idx), row, dtype=np.int32))
+            weights.append(values)
+        feats = np.concatenate(feats) if feats else np.zeros(0, dtype=np.int64)
+        order = np.argsort(feats, kind="stable")
+        self.rows = np.concatenate(rows)[order] if rows else np.zeros(0, dtype=np.int32)
+        self.weights = np.concatenate(weights)[order] if weights else np.zeros(0, dtype=np.float32)
+        self.indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(feats, minlength=len(self.vocab))))).astype(np.int64)
+        self.examples = n
+        self.classes = sorted(set(labels))
+        self.labels = np.array([self.classes.index(label) for label in labels])
+        return self
+
+    def _weights(self, counts: Counter):
+        """Vocabulary indices and L2-normalised sublinear TF-IDF weights."""
+        pairs = [(self.vocab[feat], 1 + math.log(count))
+                 for feat, count in counts.items() if feat in self.vocab]
+        if not pairs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        idx = np.array([i for i, _ in pairs])
+        values = np.array([tf for _, tf in pairs], dtype=np.float32) * self.idf[idx]
+        return idx, values / np.linalg.norm(values)
+
+    def predict(self, text: str) -> tuple[str | None, float]:
+        """Best label and its confidence in [0, 1]."""
+        idx, values = self._weights(Counter(features(text)))
+        if not len(idx) or not self.examples:
+            return None, 0.0
+        similarities = np.zeros(self.examples, dtype=np.float32)
+        for i, value in zip(idx, values):
+            start, end = self.indptr[i], self.indptr[i + 1]
+            # an example appears at most once in a feature's postings
+            similarities[self.rows[start:end]] += self.weights[start:end] * value
+        k = min(self.k, len(similarities))
+        nearest = np.argpartition(-similarities, k - 1)[:k]
+        nearest = nearest[similarities[nearest] >= self.min_similarity]
+        if not len(nearest):
+            return None, 0.0
+        votes = np.bincount(self.labels[nearest], weights=similarities[nearest],
+                            minlength=len(self.classes))
+        best = int(votes.argmax())
+        return self.classes[best], float(votes[best] / votes.sum())
+
+    def classify(self, text: str) -> str | None:
+        """The label if confidence reaches the threshold, else None (ask the LLM)."""
+        start = time.perf_counter()
+        label, confidence = self.predict(text)
+        confident = label is not None and confidence >= self.threshold
+        with self._lock:
+            self.seconds += time.perf_counter() - start
+            if confident:
+                self.answered += 1
+            else:
+                self.deferred += 1
+        return label if confident else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.answered + self.deferred
+            return {
+                "examples": self.examples,
+                "answered": self.answered,
+                "deferred": self.deferred,
+                "hit_rate": round(self.answered / calls, 3) if calls else 0.0,
+                "mean_latency_us": round(self.seconds / calls * 1e6, 1) if calls else 0.0,
+            }
+
+
+def evaluate(model: PreClassifier, texts, labels, thresholds=(0.6, 0.7, 0.8, 0.9, 1.0)) -> dict:
+    """Held-out coverage and accuracy per threshold, plus inference latency.
+
+    ``coverage`` is the share of messages answered locally, ``accuracy`` the
+    share of those that match the logged LLM label.
+    """
+    predictions = []
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        predictions.append(model.predict(text))
+        latencies.append(time.perf_counter() - start)
+    report = {"examples": len(texts), "thresholds": {}}
+    for threshold in thresholds:
+        answered = [(label, truth) for (label, confidence), truth in zip(predictions, labels)
+                    if label is not None and confidence >= threshold]
+        correct = sum(label == truth for label, truth in answered)
+        report["thresholds"][threshold] = {
+            "coverage": round(len(answered) / len(texts), 3) if texts else 0.0,
+            "accuracy": round(correct / len(answered), 3) if answered else None,
+        }
+    if latencies:
+        ordered = sorted(latencies)
+        report["mean_latency_us"] = round(sum(latencies) / len(latencies) * 1e6, 1)
+        report["p95_latency_us"] = round(ordered[int(len(ordered) * 0.95)] * 1e6, 1)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the pre-classifier on a decisions log")
+    parser.add_argument("decisions", help="JSONL log of {text, label} LLM decisions")
+    parser.add_argument("--test-fraction", type=float, default=0.2,
+                        help="share of the log held out for evaluation")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    texts, labels = read_decisions(args.decisions)
+    order = np.random.default_rng(args.seed).permutation(len(texts))
+    split = int(len(texts) * (1 - args.test_fraction))
+    train, test = order[:split], order[split:]
+    model = PreClassifier().fit([texts[i] for i in train], [labels[i] for i in train])
+    print(json.dumps(evaluate(model, [texts[i] for i in test], [labels[i] for i in test]),
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Speculative execution of the reply branch while a message is being classified.
+
+Without speculation the reply LLM call only starts once classification has
+finished, so a message costs two round trips back to back. ``Speculator``
+starts the branch for the most likely label at the same time as the
+classification call: on a hit the finished (or half-finished) reply is used
+and a whole classification round trip is saved; on a miss the speculative
+reply is cancelled and the graph runs the right branch as usual.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Speculative replies run here; cancelled ones stop at their next streamed chunk
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="speculate")
+
+
+class Speculator:
+    """Guess a label, run its branch early, keep it if the guess was right.
+
+    The guess is the caller's hint (e.g. the pre-classifier's best label, even
+    below its confidence threshold) or else the most frequent label decided so
+    far. ``branch(label, cancel)`` must check the ``cancel`` event while it
+    works and return early once it is set.
+    """
+
+    def __init__(self, default: str | None = None):
+        self.default = default
+        self.prior = Counter()
+        self.speculations = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        self._lock = threading.Lock()
+
+    def guess(self, hint: str | None = None) -> str | None:
+        if hint is not None:
+            return hint
+        with self._lock:
+            if self.prior:
+                return self.prior.most_common(1)[0][0]
+        return self.default
+
+    def run(self, guess: str, classify, branch):
+        """Classify while the guessed branch runs.
+
+        Returns ``(label, result)``; ``result`` is the branch result on a hit
+        and None on a miss, when the caller runs the branch for ``label``.
+        """
+        cancel = threading.Event()
+
+        def timed():
+            start = time.perf_counter()
+            result = branch(guess, cancel)
+            return result, time.perf_counter() - start
+
+        start = time.perf_counter()
+        # the copied context keeps the graph's callbacks (tracing, accounting) attached
+        future = _executor.submit(contextvars.copy_context().run, timed)
+        try:
+            label = classify()
+        except BaseException:
+            cancel.set()
+            raise
+        classified_in = time.perf_counter() - start
+
+        with self._lock:
+            self.prior[label] += 1
+            self.speculations += 1
+        if label != guess:
+            cancel.set()
+            with self._lock:
+                self.misses += 1
+            return label, None
+
+        try:
+            result, branch_time = future.result()
+        except Exception:
+            # the speculative branch failed; let the graph run it normally
+            with self._lock:
+                self.misses += 1
+            return label, None
+        with self._lock:
+            self.hits += 1
+            # sequential: classify + branch; speculative: max of the two
+            self.latency_saved += min(classified_in, branch_time)
+        return label, result
+
+    def record(self, label: str):
+        """Count a label decided without speculation (e.g. by the pre-classifier)."""
+        with self._lock:
+            self.prior[label] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "speculations": self.speculations,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / self.speculations, 3) if self.speculations else 0.0,
+                "latency_saved_s": round(self.latency_saved, 3),
+            }
@@ -0,0 +1,74 @@
+from pre_classifier import MIN_EXAMPLES, PreClassifier, evaluate, log_decision, read_decisions
+
+EMOTIONAL = [
+    "I feel so lonely since my friend moved away",
+    "I am anxious and can't sleep at night",
+    "my breakup still makes me sad every day",
+    "I feel overwhelmed and nobody listens to me",
+    "I'm scared about losing my job and feel hopeless",
+    "最近心情很低落，觉得很孤独",
+    "我很焦虑，晚上睡不着",
+]
+LOGICAL = [
+    "what is the capital of australia",
+    "how do I sort a list in python",
+    "explain the difference between tcp and udp",
+    "what is the boiling point of water at sea level",
+    "how many bytes are in a kilobyte",
+    "请解释一下 TCP 和 UDP 的区别",
+    "怎么用 python 对列表排序",
+]
+
+
+def _fitted(threshold=0.8):
+    texts = EMOTIONAL + LOGICAL
+    labels = ["emotional"] * len(EMOTIONAL) + ["logical"] * len(LOGICAL)
+    return PreClassifier(k=3, threshold=threshold).fit(texts, labels)
+
+
+def test_confident_messages_are_answered_locally():
+    model = _fitted()
+    assert model.classify("I feel lonely and sad") == "emotional"
+    assert model.classify("how do I sort a dict in python") == "logical"
+    assert model.classify("我觉得很孤独") == "emotional"
+    # nothing in common with any logged decision: defer to the LLM
+    assert model.predict("zebra quantum")[0] is None
+    assert model.classify("zebra quantum") is None
+
+    stats = model.stats()
+    assert stats["examples"] == len(EMOTIONAL) + len(LOGICAL)
+    # only non-zero weights are stored
+    assert len(model.weights) < stats["examples"] * len(model.vocab) / 4
+    assert stats["answered"] == 3
+    assert stats["deferred"] == 1
+    assert stats["mean_latency_us"] < 10000
+
+
+def test_threshold_trades_coverage_for_accuracy():
+    strict = _fitted(threshold=1.0)
+    label, confidence = strict.predict("I feel sad about how to sort a list")
+    assert 0 < confidence < 1
+    assert strict.classify("I feel sad about how to sort a list") is None
+
+    report = evaluate(_fitted(), ["I feel anxious and lonely", "what is the capital of france"],
+                      ["emotional", "logical"], thresholds=(0.5, 1.0))
+    assert report["thresholds"][0.5] == {"coverage": 1.0, "accuracy": 1.0}
+    assert report["thresholds"][1.0]["coverage"] <= 1.0
+    assert report["mean_latency_us"] > 0
+
+
+def test_from_log_needs_enough_decisions(tmp_path):
+    path = tmp_path / "decisions.jsonl"
+    assert PreClassifier.from_log(path) is None
+
+    for text in EMOTIONAL:
+        log_decision(path, text, "emotional")
+    for text in LOGICAL:
+        log_decision(path, text, "logical")
+    assert len(read_decisions(path)[0]) < MIN_EXAMPLES
+    assert PreClassifier.from_log(path) is None
+
+    for text in EMOTIONAL + LOGICAL:
+        log_decision(path, text, "emotional" if text in EMOTIONAL else "logical")
+    model = PreClassifier.from_log(path)
+    assert model.classify("I am anxious and lonely") == "emotional"
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from speculation import Speculator
+
+
+def _branch(log, duration=0.2):
+    def branch(label, cancel):
+        log.append(label)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            if cancel.is_set():
+                return None
+            time.sleep(0.005)
+        return f"reply for {label}"
+    return branch
+
+
+def _classify(label, duration=0.2):
+    def classify():
+        time.sleep(duration)
+        return label
+    return classify
+
+
+def test_hit_overlaps_classification_and_branch():
+    speculator = Speculator(default="logical")
+    started = []
+    start = time.perf_counter()
+    label, reply = speculator.run("logical", _classify("logical"), _branch(started))
+    elapsed = time.perf_counter() - start
+
+    assert (label, reply) == ("logical", "reply for logical")
+    assert elapsed < 0.35  # not 0.2 + 0.2
+    stats = speculator.stats()
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 1.0
+    assert stats["latency_saved_s"] >= 0.15
+
+
+def test_miss_cancels_the_speculative_branch():
+    speculator = Speculator(default="logical")
+    cancelled = threading.Event()
+
+    def branch(label, cancel):
+        cancel.wait(2)
+        cancelled.set()
+        return None
+
+    label, reply = speculator.run("logical", _classify("emotional", 0.05), branch)
+    assert (label, reply) == ("emotional", None)
+    assert cancelled.wait(1)
+    assert speculator.stats()["misses"] == 1
+
+
+def test_guess_prefers_hint_then_prior():
+    speculator = Speculator(default="logical")
+    assert speculator.guess() == "logical"
+    speculator.record("emotional")
+    speculator.record("emotional")
+    speculator.record("logical")
+    assert speculator.guess() == "emotional"
+    assert speculator.guess("logical") == "logical"
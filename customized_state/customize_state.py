@@ -1,6 +1,5 @@
 from typing import Annotated
 
-from langchain_openai import ChatOpenAI  
 from langchain_tavily import TavilySearch
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import InjectedToolCallId, tool
@@ -12,12 +11,16 @@ from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 from langgraph.types import Command, interrupt
 
-import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.clients import chat_model
+
 class State(TypedDict):
     messages: Annotated[list, add_messages]
     name: str
@@ -55,12 +58,7 @@ def human_assistance(
 
 tool = TavilySearch(max_results=2)
 tools = [tool, human_assistance]
-llm = ChatOpenAI(
-    model="deepseek-chat",  
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
+llm = chat_model("deepseek-chat", temperature=0.0)
 llm_with_tools = llm.bind_tools(tools)
 
 
@@ -11,13 +11,16 @@ import yaml
 import argparse
 from pathlib import Path
 from github import Github
-from langchain_openai import ChatOpenAI
 from typing import List, Dict, Any
+from langchain_core.messages import HumanMessage, SystemMessage
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.clients import chat_model
 
 class YAMLChatTool:
     def __init__(self, github_token: str, openai_key: str, repo_name: str = None):
         self.github = Github(github_token) if github_token else None
-        # LLM client is constructed per request via ChatOpenAI now
+        # LLM client comes from the shared pooled factory, see chat_with_llm
         self.openai_client = None
         self.repo = None
         self.working_dir = Path.cwd()
@@ -141,29 +144,18 @@ class YAMLChatTool:
         5. Consider the existing file structure when suggesting paths
         """
         
-        # Prepare file context
-        context_str = f"""
-        File: {file_context['path']}
-        Current structure preview:
-        {file_context['preview']}
-        """
-        
-        # Build a single prompt string. ChatOpenAI expects strings or LC message objects.
-        prompt = (
-            f"{system_prompt}\n\n"
-            f"{context_str}\n\n"
-            f"User request: {user_message}\n\n"
-            f"Respond ONLY with a valid JSON object per the schema."
-        )
+        # Static instructions go first and the file preview and request last, so every
+        # call shares the same prompt prefix and hits the provider's prefix cache
+        messages = [
+            SystemMessage(content=f"{system_prompt}\n"
+                                  f"Respond ONLY with a valid JSON object per the schema."),
+            HumanMessage(content=f"File: {file_context['path']}\n"
+                                 f"Current structure preview:\n{file_context['preview']}\n\n"
+                                 f"User request: {user_message}"),
+        ]
 
-        llm = ChatOpenAI(
-            model="deepseek-chat",
-            base_url="https://api.deepseek.com",
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            temperature=0.0,
-        )
         try:
-            response = llm.invoke(prompt)
+            response = chat_model("deepseek-chat", temperature=0.0).invoke(messages)
             content = getattr(response, "content", None)
             if not content:
                 return {"error": "Empty response from LLM"}
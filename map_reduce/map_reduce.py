@@ -2,18 +2,20 @@ import operator
 from typing import Annotated
 from typing_extensions import TypedDict
 
-from langchain_openai import ChatOpenAI
-
 from langgraph.types import Send
 from langgraph.graph import END, StateGraph, START
 
 from pydantic import BaseModel, Field
-import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.clients import chat_model
+
 # Model and prompts
 # Define model and prompts we will use
 subjects_prompt = """Generate a comma separated list of between 2 and 5 examples related to: {topic}."""
@@ -35,12 +37,7 @@ class BestJoke(BaseModel):
     id: int = Field(description="Index of the best joke, starting with 0", ge=0)
 
 
-model = ChatOpenAI(
-    model="deepseek-chat",
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
+model = chat_model("deepseek-chat", temperature=0.0)
 
 
 # Graph components: define the components that will make up the graph
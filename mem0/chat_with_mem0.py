@@ -1,6 +1,5 @@
 from typing import Annotated
 
-from langchain_openai import ChatOpenAI
 from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from typing_extensions import TypedDict
@@ -10,11 +9,16 @@ from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.clients import chat_model
+
 class State(TypedDict):
     messages: Annotated[list, add_messages]
     mem0_user_id: str
@@ -25,15 +29,13 @@ graph_builder = StateGraph(State)
 
 tool = TavilySearchResults(max_results=2)
 tools = [tool]
-llm = ChatOpenAI(
-    model="deepseek-chat",  
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
+llm = chat_model("deepseek-chat", temperature=0.0)
 llm_with_tools = llm.bind_tools(tools)
 mem0_client = MemoryClient(api_key=os.getenv("MEM0_API_KEY"))
 
+SYSTEM_MESSAGE = SystemMessage(content="You are a helpful customer support assistant. Use the relevant information from previous conversations, given after the messages, to personalize your responses and remember user preferences and past interactions.")
+
+
 def chatbot(state: State):
     messages = state["messages"]
     mem0_user_id = state["mem0_user_id"]
@@ -46,9 +48,9 @@ def chatbot(state: State):
     for memory in memories:
         context += f"- {memory['memory']}\n"
 
-    system_message = SystemMessage(content=f"""You are a helpful customer support assistant. Use the provided context to personalize your responses and remember user preferences and past interactions.
-{context}""")
-    full_messages = [system_message] + messages
+    # The retrieved memories change every turn; sending them after the history keeps the
+    # system prompt and conversation as a stable prefix for the provider's prompt cache
+    full_messages = [SYSTEM_MESSAGE] + messages + [SystemMessage(content=context)]
     print("full_messages::", full_messages)
     response = llm_with_tools.invoke(full_messages)
 
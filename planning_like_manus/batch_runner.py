@@ -0,0 +1,163 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from langchain_core.messages import HumanMessage
+
+import planning_agent
+from planning_agent import dag_plan_cache, plan_cache
+from tools.datasets import preload
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.accounting import RunAccounting
+from shared.budget import BudgetGovernor
+
+# 同时运行的问题数
+DEFAULT_CONCURRENCY = 4
+
+
+def read_questions(path):
+    """
+    读取问题文件：每行一个问题，或一行一个 {"id": ..., "question": ...} 的 JSON；
+    空行和 # 开头的行忽略
+
+    Returns:
+    --------
+    list
+        [{"id": 问题编号, "question": 问题}]
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                items.append({"id": item.get("id", len(items)), "question": item["question"]})
+            else:
+                items.append({"id": len(items), "question": line})
+    return items
+
+
+def run_question(agent, item, budget_limits=None, batch_start=None, totals=None):
+    """运行单个问题，返回一条结果记录，异常记录在 error 中而不中断整个批次
+
+    每个问题单独记录各节点的调用次数、token 和耗时；传入 totals 时累加到批次汇总中
+    """
+    budget = BudgetGovernor(**(budget_limits or {}))
+    accounting = RunAccounting()
+    start = time.perf_counter()
+    record = {"id": item["id"], "question": item["question"],
+              "answer": None, "error": None}
+    try:
+        ret = agent.invoke({"messages": [HumanMessage(content=item["question"])]},
+                           budget.attach({"callbacks": [accounting]}))
+        record["answer"] = ret["messages"][-1].content
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    end = time.perf_counter()
+    if batch_start is not None:
+        record["started_s"] = round(start - batch_start, 3)
+    record["elapsed_s"] = round(end - start, 3)
+    record["budget"] = budget.report()
+    record["accounting"] = accounting.report()["nodes"]
+    if totals is not None:
+        totals.merge(accounting)
+    return record
+
+
+def run_batch(items, agent, output, concurrency=DEFAULT_CONCURRENCY, budget_limits=None,
+              totals=None):
+    """
+    在同一进程内并发运行一批问题，数据集、计划缓存和 LLM 客户端在问题之间共享
+
+    Parameters:
+    -----------
+    items : list
+        read_questions 的返回值
+    agent : 已编译的图
+    output : file
+        每个问题完成后立即写入一行 JSON，中途失败也能保留已完成的结果
+    concurrency : int
+        同时运行的问题数上限
+    totals : RunAccounting, optional
+        累加所有问题的按节点统计
+
+    Returns:
+    --------
+    list
+        按完成顺序排列的结果记录
+    """
+    batch_start = time.perf_counter()
+    records = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_question, agent, item, budget_limits,
+                                   batch_start, totals)
+                   for item in items]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+    return records
+
+
+def summarize(records, wall_clock):
+    elapsed = [record["elapsed_s"] for record in records]
+    return {
+        "questions": len(records),
+        "failed": sum(record["error"] is not None for record in records),
+        "wall_clock_s": round(wall_clock, 3),
+        "sum_elapsed_s": round(sum(elapsed), 3),
+        "max_elapsed_s": max(elapsed, default=0),
+        "plan_cache": plan_cache.stats(),
+        "dag_plan_cache": dag_plan_cache.stats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量运行股票分析智能体")
+    parser.add_argument("questions", help="问题文件：每行一个问题或一个 JSON 对象")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="结果输出文件 (JSONL)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="同时运行的问题数")
+    parser.add_argument("--dag", action="store_true", help="使用 DAG 模式运行")
+    parser.add_argument("--max-steps", type=int, help="每个问题最多执行的节点步数")
+    parser.add_argument("--deadline", type=float, help="每个问题的运行时间上限（秒）")
+    parser.add_argument("--accounting-out", help="按节点统计的导出文件 (.json 或 .csv)")
+    args = parser.parse_args(argv)
+
+    items = read_questions(args.questions)
+    # 并发输出调试信息会互相穿插，批量模式只输出汇总
+    planning_agent.VERBOSE = False
+
+    # 数据集和 LLM 客户端在开始前加载一次，所有问题共用
+    start = time.perf_counter()
+    preload()
+    if args.dag:
+        planning_agent.get_dag_models()
+        agent = planning_agent.get_dag_agent()
+    else:
+        planning_agent.get_models()
+        planning_agent.get_synthesizer()
+        agent = planning_agent.get_agent()
+    print(f"warm-up {time.perf_counter() - start:.2f}s, {len(items)} questions", file=sys.stderr)
+
+    start = time.perf_counter()
+    totals = RunAccounting()
+    with open(args.output, "w", encoding="utf-8") as output:
+        records = run_batch(items, agent, output, args.concurrency,
+                            {"max_steps": args.max_steps, "deadline": args.deadline}, totals)
+    print(json.dumps(summarize(records, time.perf_counter() - start), ensure_ascii=False))
+    print(totals.summary(), file=sys.stderr)
+    if args.accounting_out:
+        totals.export(args.accounting_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,20 @@
-import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
-from langchain_openai import ChatOpenAI
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.clients import chat_model
+
+# 同一模型共用一个客户端实例和连接池，重复调用不会重新建连
 
 def DeepSeekV3():
-    return ChatOpenAI(
-        model= "deepseek-chat",
-        api_key= os.environ.get("DEEPSEEK_API_KEY"),
-        base_url="https://api.deepseek.com",
-    )
+    return chat_model("deepseek-chat")
 
 def Tongyi():
-    return ChatOpenAI(
-        model="qwen-max",
-        api_key=os.environ.get("AI_DASHSCOPE_API_KEY"),
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-    )
+    return chat_model("qwen-max", provider="dashscope")
 
 def DeepSeekR1():
-    return ChatOpenAI(
-        model= "deepseek-reasoner",
-        api_key= os.environ.get("DEEPSEEK_API_KEY"),
-        base_url="https://api.deepseek.com",
-    )
\ No newline at end of file
+    return chat_model("deepseek-reasoner")
@@ -0,0 +1,94 @@
+import re
+
+from langchain_core.messages import ToolMessage
+
+# 单条工具结果进入消息历史的 token 预算
+DEFAULT_TOKEN_BUDGET = 1500
+
+# 财报中对分析没有意义的列
+_DROP_COLUMNS = ['Unnamed: 0', '序号']
+_CJK = re.compile(r'[\u4e00-\u9fff]')
+# 百分比/比率列保留 2 位小数，价格等其余小数保留 3 位，金额等大数取整
+_PERCENT_COLUMN = re.compile(r'%|率|增长')
+_AMOUNT_THRESHOLD = 1e5
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文字符约 1 个 token，其余约 4 个字符 1 个 token"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk) // 4
+
+
+def _round_columns(table):
+    """按列舍入浮点数，避免统一的有效数字格式把价格和金额截断或写成科学计数法"""
+    table = table.copy()
+    for column in table.select_dtypes(include='float').columns:
+        values = table[column]
+        if _PERCENT_COLUMN.search(str(column)):
+            table[column] = values.round(2)
+        elif values.abs().max() >= _AMOUNT_THRESHOLD:
+            table[column] = values.round().astype('Int64')
+        else:
+            table[column] = values.round(3)
+    return table
+
+
+def to_compact_table(observation) -> str:
+    """
+    工具结果转换为紧凑的 CSV 表格文本
+
+    DataFrame 直接输出；get_financial_report 返回的 {代码: {'data': [...]}} 展开成一张表，
+    列名只出现一次，而不是在每条记录里重复
+    """
+    import pandas as pd
+
+    if observation is None:
+        return "无数据"
+    if isinstance(observation, dict) and all(
+            isinstance(v, dict) and 'data' in v for v in observation.values()):
+        rows = [row for v in observation.values() for row in v['data']]
+        missing = [code for code, v in observation.items() if not v['data']]
+        table = pd.DataFrame(rows).drop(columns=_DROP_COLUMNS, errors='ignore')
+        text = _round_columns(table).to_csv(index=False) if rows else ""
+        if missing:
+            text += f"无数据的股票: {', '.join(missing)}\n"
+        return text
+    if isinstance(observation, pd.DataFrame):
+        return _round_columns(observation).to_csv(index=False)
+    return str(observation)
+
+
+def compact_observation(observation, budget=DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    工具结果压缩为表格，超出 token 预算时按行截断并注明截断的行数
+
+    Parameters:
+    -----------
+    observation : any
+        工具原始返回值
+    budget : int
+        结果文本的 token 预算
+    """
+    text = to_compact_table(observation)
+    if estimate_tokens(text) <= budget:
+        return text
+
+    lines = text.splitlines()
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept) + (
+        f"\n...（结果已截断：共 {len(lines)} 行，仅显示前 {len(kept)} 行）")
+
+
+def full_observation(messages, ref):
+    """按 tool_call_id 取回保存在 ToolMessage.artifact 中的完整工具结果（供程序使用，不发送给模型）"""
+    for message in messages:
+        if isinstance(message, ToolMessage) and message.tool_call_id == ref:
+            return message.artifact
+    return None
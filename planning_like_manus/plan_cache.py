@@ -0,0 +1,140 @@
+import re
+import threading
+from collections import OrderedDict
+
+# 一段连续列出的股票代码，如 '600600', '002461' 或 600600、002461和000729
+_QUOTE = r"['\"“”‘’]?"
+_CODE = rf"{_QUOTE}(?<!\d)\d{{6}}(?!\d){_QUOTE}"
+CODE_RUN = re.compile(rf"{_CODE}(?:\s*[,，、和及与]\s*{_CODE})*")
+CODE = re.compile(r"(?<!\d)\d{6}(?!\d)")
+DATE = re.compile(
+    r"\d{4}-\d{1,2}-\d{1,2}|\d{4}年\d{1,2}月\d{1,2}日|(?<!\d)\d{8}(?!\d)")
+
+
+def _code_runs(text):
+    """返回 [(匹配对象, 代码列表)]"""
+    return [(m, CODE.findall(m.group())) for m in CODE_RUN.finditer(text)]
+
+
+def _run_format(run):
+    """记录一段代码列表的书写格式：前缀、分隔符、后缀"""
+    text = run.group()
+    codes = list(CODE.finditer(text))
+    prefix = text[:codes[0].start()]
+    suffix = text[codes[-1].end():]
+    joiner = text[codes[0].end():codes[1].start()] if len(codes) > 1 else "、"
+    return prefix, joiner, suffix
+
+
+def normalize_question(question):
+    """
+    把问题抽象成模板：日期替换为 {date0}、{date1}…，每段股票代码列表替换为 {codes0}、{codes1}…
+
+    Returns:
+    --------
+    tuple
+        (模板, 各段代码列表, 日期列表)
+    """
+    dates = DATE.findall(question)
+    template = question
+    for i, date in enumerate(dates):
+        template = template.replace(date, f"{{date{i}}}", 1)
+
+    code_runs = []
+    parts = []
+    last = 0
+    for i, (run, codes) in enumerate(_code_runs(template)):
+        parts.append(template[last:run.start()])
+        parts.append(f"{{codes{i}}}")
+        code_runs.append(codes)
+        last = run.end()
+    parts.append(template[last:])
+    template = " ".join("".join(parts).split())
+    return template, code_runs, dates
+
+
+def templatize_plan(plan, code_runs, dates):
+    """
+    把计划中与问题一致的代码列表和日期替换为占位符
+
+    计划中出现的代码若不是问题里某段代码列表的完整复述（例如逐只分开写），无法可靠地
+    替换为新代码，返回 None 表示不可缓存
+    """
+    parts = []
+    last = 0
+    for run, codes in _code_runs(plan):
+        index = next((i for i, run_codes in enumerate(code_runs)
+                      if sorted(run_codes) == sorted(codes)), None)
+        if index is None:
+            return None
+        prefix, joiner, suffix = _run_format(run)
+        parts.append(plan[last:run.start()])
+        parts.append(f"{{codes{index}|{prefix}|{joiner}|{suffix}}}")
+        last = run.end()
+    parts.append(plan[last:])
+    template = "".join(parts)
+    for i, date in enumerate(dates):
+        template = template.replace(date, f"{{date{i}}}")
+    return template
+
+
+_PLAN_CODES = re.compile(r"\{codes(\d+)\|([^|]*)\|([^|]*)\|([^}]*)\}")
+
+
+def instantiate_plan(template, code_runs, dates):
+    """用新问题中的代码和日期填充计划模板"""
+    plan = _PLAN_CODES.sub(
+        lambda m: m.group(2) + m.group(3).join(code_runs[int(m.group(1))]) + m.group(4),
+        template)
+    for i, date in enumerate(dates):
+        plan = plan.replace(f"{{date{i}}}", date)
+    return plan
+
+
+class PlanCache:
+    """
+    按问题模板缓存分析计划
+
+    同一句式、只是股票代码或日期不同的问题复用已有计划，省去一次规划模型调用
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()  # 问题模板 -> 计划模板
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+    def get(self, question):
+        template, code_runs, dates = normalize_question(question)
+        with self._lock:
+            plan_template = self._plans.get(template)
+            if plan_template is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._plans.move_to_end(template)
+        return instantiate_plan(plan_template, code_runs, dates)
+
+    def put(self, question, plan) -> bool:
+        template, code_runs, dates = normalize_question(question)
+        plan_template = templatize_plan(plan, code_runs, dates)
+        with self._lock:
+            if plan_template is None:
+                self.uncacheable += 1
+                return False
+            self._plans[template] = plan_template
+            self._plans.move_to_end(template)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "entries": len(self._plans),
+            }
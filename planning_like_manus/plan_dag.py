@@ -0,0 +1,97 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class PlanStep(BaseModel):
+    id: str = Field(description="步骤编号，如 s1、s2")
+    description: str = Field(description="该步骤要分析和执行的内容")
+    tool: Optional[str] = Field(
+        default=None,
+        description="要调用的工具名；为空表示由模型根据依赖步骤的结果进行综合分析")
+    args: dict = Field(default_factory=dict, description="工具参数，如 {\"stock_codes\": [\"600600\"]}")
+    depends_on: list[str] = Field(default_factory=list, description="依赖的步骤编号")
+
+
+class StructuredPlan(BaseModel):
+    steps: list[PlanStep] = Field(description="按执行顺序排列的步骤")
+
+
+def topological_waves(steps):
+    """
+    按依赖关系把步骤分成若干波，同一波内的步骤互不依赖，可以并行执行
+
+    Raises:
+    -------
+    ValueError
+        依赖了不存在的步骤，或存在循环依赖
+    """
+    by_id = {step.id: step for step in steps}
+    for step in steps:
+        unknown = [dep for dep in step.depends_on if dep not in by_id]
+        if unknown:
+            raise ValueError(f"步骤 {step.id} 依赖了不存在的步骤: {unknown}")
+
+    waves = []
+    done = set()
+    remaining = list(steps)
+    while remaining:
+        wave = [step for step in remaining if set(step.depends_on) <= done]
+        if not wave:
+            raise ValueError(f"计划存在循环依赖: {[step.id for step in remaining]}")
+        waves.append(wave)
+        done.update(step.id for step in wave)
+        remaining = [step for step in remaining if step.id not in done]
+    return waves
+
+
+def execute_plan(plan, tools_by_name, synthesize, max_workers=4, on_step=None):
+    """
+    以 DAG 方式执行结构化计划
+
+    工具步骤直接调用工具，不经过模型；只有综合分析步骤（tool 为空）调用 synthesize。
+    每一波内的步骤并行执行。
+
+    Parameters:
+    -----------
+    plan : StructuredPlan
+    tools_by_name : dict
+        工具名 -> LangChain 工具
+    synthesize : callable
+        synthesize(step, dependency_results) -> str，dependency_results 为 {步骤编号: 结果}
+    on_step : callable
+        可选，每个步骤完成时回调 on_step(step, result, elapsed)
+
+    Returns:
+    --------
+    dict
+        步骤编号 -> 结果（工具原始返回值或综合分析文本；失败时为错误信息）
+    """
+    results = {}
+
+    def run(step):
+        start = time.perf_counter()
+        try:
+            if step.tool is None:
+                result = synthesize(step, {dep: results[dep] for dep in step.depends_on})
+            elif step.tool not in tools_by_name:
+                result = f"错误: 未知工具 {step.tool}"
+            else:
+                result = tools_by_name[step.tool].invoke(step.args)
+        except Exception as e:
+            result = f"错误: 步骤 {step.id} 执行失败: {e}"
+        elapsed = time.perf_counter() - start
+        if on_step is not None:
+            on_step(step, result, elapsed)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for wave in topological_waves(plan.steps):
+            futures = [executor.submit(contextvars.copy_context().run, run, step)
+                       for step in wave]
+            for step, future in zip(wave, futures):
+                results[step.id] = future.result()
+    return results
@@ -1,61 +1,133 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from langgraph.config import get_stream_writer
 from langgraph.graph import MessagesState, StateGraph, START, END
-from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, ToolMessage
 from typing_extensions import Literal
-from llm import Tongyi, DeepSeekV3
 from tools.read_local_financial_report import get_financial_report
 from tools.analysis_local_all_stock_price import analyze_stocks
-from prompt import plan_prompt
+from prompt import (current_plan_prompt, dag_plan_prompt, executor_prompt, finalize_prompt,
+                    plan_prompt)
+from plan_cache import PlanCache
+from plan_dag import PlanStep, StructuredPlan, execute_plan
+from observation import DEFAULT_TOKEN_BUDGET, compact_observation
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.accounting import account_run
+from shared.budget import BudgetGovernor, drop_pending_tool_calls, get_budget
 
 # Nodes
 tools = [get_financial_report, analyze_stocks]
 tools_by_name = {tool.name: tool for tool in tools}
-deepseek_v3 = DeepSeekV3()
-deepseek_r1 = Tongyi()
-llm_with_tools = deepseek_v3.bind_tools(tools)
+# 同一轮中多个工具调用并发执行的线程数
+TOOL_WORKERS = 4
+# 同一句式的问题复用计划，只替换股票代码和日期
+plan_cache = PlanCache()
+dag_plan_cache = PlanCache()
+# 单条工具结果进入消息历史的 token 预算
+OBSERVATION_TOKEN_BUDGET = DEFAULT_TOKEN_BUDGET
+# 是否打印节点的调试输出，流式模式下关闭以免与增量输出混在一起
+VERBOSE = True
+# 默认问题，命令行未指定问题时使用
+DEFAULT_QUESTION = "对比一下 '600600', '002461', '000729', '600573' 这四只股票的股价表现和财务情况，哪家更值得投资"
 
 
 class State(MessagesState):
     plan: str
 
 
+@lru_cache(maxsize=None)
+def get_models():
+    """
+    延迟创建 LLM 客户端，导入本模块时不会构造任何客户端
+
+    Returns:
+    --------
+    tuple
+        (规划模型, 绑定了工具的执行模型)
+    """
+    from llm import Tongyi, DeepSeekV3
+
+    planner = Tongyi()
+    llm_with_tools = DeepSeekV3().bind_tools(tools)
+    return planner, llm_with_tools
+
+
+@lru_cache(maxsize=None)
+def get_synthesizer():
+    """不绑定工具的综合分析模型，用于预算收尾和 DAG 模式的综合步骤"""
+    from llm import DeepSeekV3
+
+    return DeepSeekV3()
+
+
 def plan_node(state):
-    # 创建消息列表
-    prompt = plan_prompt
+    question = state["messages"][0].content
+    plan = plan_cache.get(question)
+    if plan is None:
+        # 创建消息列表
+        prompt = plan_prompt
 
-    # 调用 LLM
-    response = deepseek_r1.invoke(
-        [SystemMessage(content=prompt), state["messages"][0]])
+        # 调用 LLM
+        planner, _ = get_models()
+        response = planner.invoke(
+            [SystemMessage(content=prompt), state["messages"][0]])
+        plan = response.content
+        plan_cache.put(question, plan)
+    elif VERBOSE:
+        print("plan cache hit, reusing plan template")
 
-    state["plan"] = response.content
-    print(f"the plan returned by reasoner:\n {state["plan"]}")
+    state["plan"] = plan
+    if VERBOSE:
+        print(f"the plan returned by reasoner:\n {state['plan']}")
     return state
 
 
-def llm_call(state):
-    """LLM decides whether to call a tool or not"""
-    # 创建消息列表 这里的“+”号操作是两个数组的合并
-    messages = [
-                   SystemMessage(
-                       content=f"""
-你是一个思路清晰，有条理的金融分析师，必须严格按照以下金融分析计划执行：
+def with_plan(system_prompt, plan, messages):
+    """
+    按 固定系统提示词 -> 用户问题 -> 当前计划 -> 后续消息 的顺序组装消息
 
-当前金融分析计划：
-{state["plan"]}
+    固定内容在前、可变内容在后，同一问题的多轮调用以及不同问题之间都共享最长的请求前缀，
+    能命中 DeepSeek 等服务端的前缀缓存，节省输入 token 的费用和首 token 延迟
 
-如果你认为计划已经执行到最后一步了，请在内容的末尾加上\nFinal Answer字样
+    Parameters:
+    -----------
+    system_prompt : str
+        不含任何可变内容的系统提示词
+    plan : str
+        当前金融分析计划
+    messages : list
+        消息历史，第一条是用户问题
 
-示例：
-分析报告xxxxxxxx
-Final Answer
-            """
-                   )
-               ] + state["messages"]
+    Returns:
+    --------
+    list
+        发送给模型的消息列表
+    """
+    return ([SystemMessage(content=system_prompt), messages[0],
+             HumanMessage(content=current_plan_prompt.format(plan=plan))]
+            + list(messages[1:]))
 
-    print("------messages[-1]-------")
-    print(state["messages"][-1])
-    print("------------------")
+
+def llm_call(state):
+    """LLM decides whether to call a tool or not"""
+    messages = with_plan(executor_prompt, state["plan"], state["messages"])
+
+    if VERBOSE:
+        print("------messages[-1]-------")
+        print(state["messages"][-1])
+        print("------------------")
 
     # 调用 LLM
+    _, llm_with_tools = get_models()
     response = llm_with_tools.invoke(messages)
 
     # 将响应添加到消息列表中
@@ -64,72 +136,329 @@ Final Answer
     return state
 
 
+def _invoke_tool(tool_call):
+    tool = tools_by_name[tool_call["name"]]
+    start = time.perf_counter()
+    observation = tool.invoke(tool_call["args"])
+    return observation, time.perf_counter() - start
+
+
 def tool_node(state):
-    """Performs the tool call"""
-    result = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool = tools_by_name[tool_call["name"]]
-        observation = tool.invoke(tool_call["args"])
-        # 将观察结果转换为字符串格式
-        if isinstance(observation, list):
-            # 如果是列表，将其转换为字符串表示
-            observation = str(observation)
-        # result.append(ToolMessage(content=observation, tool_call_id=tool_call["id"]))
+    """Performs the tool calls concurrently, keeping ToolMessage order"""
+    tool_calls = state["messages"][-1].tool_calls
+
+    def run(tool_call):
+        writer = get_stream_writer()
+        writer({"tool": tool_call["name"], "status": "start"})
+        observation, elapsed = _invoke_tool(tool_call)
+        writer({"tool": tool_call["name"], "status": "done", "elapsed": elapsed})
+        return observation, elapsed
+
+    start = time.perf_counter()
+    # 彼此独立的工具调用放到线程池并发执行，按 tool_calls 顺序收集结果；
+    # 每个调用复制一份当前上下文，工作线程里才能拿到图运行时（stream writer、回调）
+    with ThreadPoolExecutor(max_workers=TOOL_WORKERS) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run, tool_call)
+                   for tool_call in tool_calls]
+        outcomes = [future.result() for future in futures]
+    wall_clock = time.perf_counter() - start
+
+    for tool_call, (observation, _) in zip(tool_calls, outcomes):
+        # 压缩为紧凑表格再放入消息历史，完整结果保存在 artifact 中，不会发送给模型
+        content = compact_observation(observation, OBSERVATION_TOKEN_BUDGET)
         state["messages"].append(
-            ToolMessage(content=observation, tool_call_id=tool_call["id"]))
-        print(f"tool_call: {tool_call}")
-        print(f"observation: {observation}")
+            ToolMessage(content=content, artifact=observation,
+                        tool_call_id=tool_call["id"]))
+        if VERBOSE:
+            print(f"tool_call: {tool_call}")
+            print(f"observation: {content}")
+
+    sequential = sum(elapsed for _, elapsed in outcomes)
+    if VERBOSE:
+        print(f"tools: {len(tool_calls)} calls, wall clock {wall_clock:.2f}s, "
+              f"sequential {sequential:.2f}s, saved {sequential - wall_clock:.2f}s")
     return state
 
 
+def finalize_node(state):
+    """预算即将用尽：不再调用工具，根据已有结果直接给出最终报告"""
+    messages = with_plan(finalize_prompt, state["plan"],
+                         drop_pending_tool_calls(state["messages"]))
+
+    response = get_synthesizer().invoke(messages)
+    return {"messages": [response]}
+
+
 # Conditional edge function to route to the tool node or end based upon whether the LLM made a tool call
-def should_continue(state) -> Literal["environment", "END"]:
+def should_continue(state, config) -> Literal["Action", "Finalize", "END"]:
     """Decide if we should continue the loop or stop based upon whether the LLM made a tool call"""
     messages = state["messages"]
     last_message = messages[-1]
     # If the LLM makes a tool call, then perform an action
     if "Final Answer" in last_message.content:
         return "END"
+    # 预算接近上限时不再继续循环，转入收尾节点给出最终报告
+    budget = get_budget(config)
+    if budget is not None and budget.should_finalize():
+        if VERBOSE:
+            print(f"budget nearly used up ({', '.join(budget.approaching())}), finalizing")
+        return "Finalize"
     # Otherwise, we stop (reply to the user)
     return "Action"
 
 
-# Build workflow
-agent_builder = StateGraph(State)
-
-# Add nodes
-agent_builder.add_node("plan_node", plan_node)
-agent_builder.add_node("llm_call", llm_call)
-agent_builder.add_node("environment", tool_node)
-
-# Add edges to connect nodes
-agent_builder.add_edge(START, "plan_node")
-agent_builder.add_edge("plan_node", "llm_call")
-agent_builder.add_conditional_edges(
-    "llm_call",
-    should_continue,
-    {
-        # Name returned by should_continue : Name of next node to visit
-        "Action": "environment",
-        "END": END,
-    },
-)
-agent_builder.add_edge("environment", "llm_call")
-
-# Compile the agent
-agent = agent_builder.compile()
-
-# 保存代理工作流程图到文件
-# Get the Mermaid definition
-mermaid_def = agent.get_graph(xray=True).draw_mermaid()
-with open("/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus/output/agent_graph.mmd", "w") as f:
-    f.write(mermaid_def)
-
-# Invoke
-messages = [HumanMessage(
-    content="对比一下 '600600', '002461', '000729', '600573' 这四只股票的股价表现和财务情况，哪家更值得投资")]
-# question = "对比一下 600600, 002461, 000729, 600573的股价表现和财务情况，哪家更值得投资"
-ret = agent.invoke({"plan": "", "messages": messages})
-
-print("------final answer-------")
-print(ret["messages"][-1].content)
\ No newline at end of file
+def build_agent():
+    """Build and compile the planning agent graph"""
+    agent_builder = StateGraph(State)
+
+    # Add nodes
+    agent_builder.add_node("plan_node", plan_node)
+    agent_builder.add_node("llm_call", llm_call)
+    agent_builder.add_node("environment", tool_node)
+    agent_builder.add_node("finalize", finalize_node)
+
+    # Add edges to connect nodes
+    agent_builder.add_edge(START, "plan_node")
+    agent_builder.add_edge("plan_node", "llm_call")
+    agent_builder.add_conditional_edges(
+        "llm_call",
+        should_continue,
+        {
+            # Name returned by should_continue : Name of next node to visit
+            "Action": "environment",
+            "Finalize": "finalize",
+            "END": END,
+        },
+    )
+    agent_builder.add_edge("environment", "llm_call")
+    agent_builder.add_edge("finalize", END)
+
+    # Compile the agent
+    return agent_builder.compile()
+
+
+@lru_cache(maxsize=None)
+def get_agent():
+    """进程内共享的已编译智能体"""
+    return build_agent()
+
+
+class DagState(MessagesState):
+    structured_plan: dict
+    step_results: dict
+
+
+@lru_cache(maxsize=None)
+def get_dag_models():
+    """
+    DAG 模式使用的模型，同样延迟创建
+
+    Returns:
+    --------
+    tuple
+        (输出结构化计划的规划模型, 综合分析模型)
+    """
+    from llm import Tongyi
+
+    planner = Tongyi().with_structured_output(StructuredPlan,
+                                              method="function_calling")
+    return planner, get_synthesizer()
+
+
+def dag_plan_node(state):
+    """生成结构化计划：每个步骤带工具、参数和依赖"""
+    question = state["messages"][0].content
+    cached = dag_plan_cache.get(question)
+    if cached is not None:
+        plan = StructuredPlan.model_validate_json(cached)
+        if VERBOSE:
+            print("plan cache hit, reusing plan template")
+    else:
+        planner, _ = get_dag_models()
+        plan = planner.invoke(
+            [SystemMessage(content=dag_plan_prompt), state["messages"][0]])
+        dag_plan_cache.put(question, plan.model_dump_json())
+
+    if VERBOSE:
+        print("the structured plan returned by reasoner:")
+        for step in plan.steps:
+            print(f" {step.id} {step.description} tool={step.tool} "
+                  f"args={step.args} depends_on={step.depends_on}")
+    return {"structured_plan": plan.model_dump()}
+
+
+def dag_execute_node(state):
+    """按依赖关系并行执行工具步骤，只有综合分析步骤调用模型"""
+    plan = StructuredPlan.model_validate(state["structured_plan"])
+    question = state["messages"][0].content
+    _, synthesizer = get_dag_models()
+    llm_calls = 0
+
+    def synthesize(step, dependency_results):
+        nonlocal llm_calls
+        llm_calls += 1
+        context = "\n\n".join(
+            f"[{dep}]\n{compact_observation(result, OBSERVATION_TOKEN_BUDGET)}"
+            for dep, result in dependency_results.items())
+        response = synthesizer.invoke([
+            SystemMessage(content="你是一个思路清晰，有条理的金融分析师，请只根据给出的数据完成当前分析步骤。"),
+            HumanMessage(content=f"用户问题：{question}\n\n当前步骤：{step.description}\n\n"
+                                 f"依赖步骤的结果：\n{context}")])
+        return response.content
+
+    def on_step(step, result, elapsed):
+        get_stream_writer()({"tool": step.tool or f"synthesis {step.id}",
+                             "status": "done", "elapsed": elapsed})
+        if VERBOSE:
+            print(f"step {step.id} done in {elapsed:.2f}s")
+
+    results = execute_plan(plan, tools_by_name, synthesize, TOOL_WORKERS, on_step)
+
+    final_step = plan.steps[-1] if plan.steps else None
+    if final_step is None or final_step.tool is not None:
+        # 计划没有以综合分析结束时补一步，保证输出的是结论而不是原始数据
+        final_step = PlanStep(id="final", description="综合以上结果回答用户问题",
+                              depends_on=list(results))
+        results["final"] = synthesize(final_step, dict(results))
+
+    if VERBOSE:
+        print(f"dag: {len(plan.steps)} steps, {llm_calls} synthesis LLM calls")
+    return {"step_results": results,
+            "messages": [AIMessage(content=str(results[final_step.id]))]}
+
+
+def build_dag_agent():
+    """Build the plan-to-DAG agent: one planner call, parallel tool steps, LLM only for synthesis"""
+    agent_builder = StateGraph(DagState)
+    agent_builder.add_node("dag_plan", dag_plan_node)
+    agent_builder.add_node("dag_execute", dag_execute_node)
+    agent_builder.add_edge(START, "dag_plan")
+    agent_builder.add_edge("dag_plan", "dag_execute")
+    agent_builder.add_edge("dag_execute", END)
+    return agent_builder.compile()
+
+
+@lru_cache(maxsize=None)
+def get_dag_agent():
+    return build_dag_agent()
+
+
+def save_mermaid(agent, path):
+    """保存代理工作流程图 (Mermaid) 到文件"""
+    mermaid_def = agent.get_graph(xray=True).draw_mermaid()
+    with open(path, "w") as f:
+        f.write(mermaid_def)
+
+
+# 流式输出时各节点 token 流的标题
+_STREAM_HEADERS = {
+    "plan_node": "\n------plan------\n",
+    "llm_call": "\n------analysis------\n",
+    "finalize": "\n------final synthesis------\n",
+    "dag_execute": "\n------synthesis------\n",
+}
+
+
+async def astream_run(question, agent=None, config=None):
+    """
+    流式运行：计划、工具进度和最终报告在生成的同时输出
+
+    Returns:
+    --------
+    str
+        最终回答
+    """
+    agent = agent or get_agent()
+    inputs = {"messages": [HumanMessage(content=question)]}
+    start = time.perf_counter()
+    first_output = None
+    current_node = None
+    answer = ""
+
+    def emit(text):
+        nonlocal first_output
+        if first_output is None:
+            first_output = time.perf_counter() - start
+        print(text, end="", flush=True)
+
+    async for mode, chunk in agent.astream(
+            inputs, config, stream_mode=["messages", "custom", "updates"]):
+        if mode == "messages":
+            token, metadata = chunk
+            node = metadata.get("langgraph_node")
+            if node not in _STREAM_HEADERS or not token.content:
+                continue
+            if node != current_node:
+                current_node = node
+                emit(_STREAM_HEADERS[node])
+            emit(token.content)
+        elif mode == "custom":
+            status = f"{chunk['elapsed']:.2f}s" if chunk["status"] == "done" else "..."
+            current_node = None
+            emit(f"\n[tool] {chunk['tool']} {chunk['status']} {status}")
+        elif "plan_node" in chunk and current_node != "plan_node":
+            # 计划缓存命中时没有 token 流，直接输出计划
+            emit(f"\n------plan (cached)------\n{chunk['plan_node']['plan']}")
+        elif "dag_plan" in chunk:
+            steps = chunk["dag_plan"]["structured_plan"]["steps"]
+            emit("\n------plan------\n" + "\n".join(
+                f"{step['id']} {step['description']}" for step in steps))
+        elif "llm_call" in chunk or "dag_execute" in chunk or "finalize" in chunk:
+            node_update = (chunk.get("llm_call") or chunk.get("dag_execute")
+                           or chunk.get("finalize"))
+            answer = node_update["messages"][-1].content
+
+    print(f"\n\ntime to first output {first_output or 0:.2f}s, "
+          f"total {time.perf_counter() - start:.2f}s")
+    return answer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="manus 风格的股票分析智能体")
+    parser.add_argument("question", nargs="?", default=DEFAULT_QUESTION,
+                        help="要分析的问题")
+    parser.add_argument("--mermaid", help="保存工作流程图 (Mermaid) 的文件路径")
+    parser.add_argument("--stream", action="store_true",
+                        help="流式输出计划、工具进度和最终报告")
+    parser.add_argument("--dag", action="store_true",
+                        help="生成结构化计划并按 DAG 并行执行，只有综合分析步骤调用模型")
+    parser.add_argument("--max-steps", type=int, help="最多执行的节点步数")
+    parser.add_argument("--max-prompt-tokens", type=int, help="输入 token 上限")
+    parser.add_argument("--max-completion-tokens", type=int, help="输出 token 上限")
+    parser.add_argument("--deadline", type=float, help="运行时间上限（秒）")
+    parser.add_argument("--accounting-out", help="按节点统计的导出文件 (.json 或 .csv)")
+    args = parser.parse_args(argv)
+
+    # 预算接近上限时强制收尾，并记录本次运行的消耗
+    budget = BudgetGovernor(max_steps=args.max_steps,
+                            max_prompt_tokens=args.max_prompt_tokens,
+                            max_completion_tokens=args.max_completion_tokens,
+                            deadline=args.deadline)
+    config = budget.attach()
+
+    agent = get_dag_agent() if args.dag else get_agent()
+    if args.mermaid:
+        save_mermaid(agent, args.mermaid)
+
+    # 统计每个节点的模型调用次数、token、耗时和工具耗时
+    with account_run() as accounting:
+        if args.stream:
+            global VERBOSE
+            VERBOSE = False
+            asyncio.run(astream_run(args.question, agent, config))
+        else:
+            # Invoke
+            messages = [HumanMessage(content=args.question)]
+            ret = agent.invoke({"messages": messages}, config)
+
+            print("------final answer-------")
+            print(ret["messages"][-1].content)
+
+    print(f"budget: {json.dumps(budget.report(), ensure_ascii=False)}")
+    print(accounting.summary())
+    if args.accounting_out:
+        accounting.export(args.accounting_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -35,3 +35,41 @@ analyze_stocks:
 4.只需输出计划内容，不要做任何额外的解释和说明
 5.设计的方案步骤要紧紧贴合我的工具所能返回的内容，不要超出工具返回的内容
 """
+
+dag_plan_prompt = plan_prompt.replace("""要求：
+1.用中文列出清晰步骤
+2.每个步骤标记序号
+3.明确说明需要分析和执行的内容
+4.只需输出计划内容，不要做任何额外的解释和说明
+5.设计的方案步骤要紧紧贴合我的工具所能返回的内容，不要超出工具返回的内容
+""", """要求：
+1.以结构化步骤输出计划，每个步骤包含 id、description、tool、args、depends_on
+2.获取数据的步骤填写 tool 和 args（如 {"stock_codes": ["600600"]}），一次工具调用尽量覆盖全部股票代码
+3.需要模型分析、对比、总结的步骤 tool 留空，并在 depends_on 中列出它需要的数据步骤
+4.互不依赖的数据步骤不要相互依赖，以便并行执行
+5.综合分析步骤尽量合并，最后一个步骤必须是给出最终结论的综合分析步骤
+6.设计的方案步骤要紧紧贴合我的工具所能返回的内容，不要超出工具返回的内容
+""")
+
+# 执行和收尾阶段的系统提示词只包含固定内容，放在消息最前面，
+# 不同问题、不同轮次的请求共享同一前缀，可以命中模型服务端的前缀缓存；
+# 计划等可变内容放在用户问题之后（见 current_plan_prompt）
+executor_prompt = """
+你是一个思路清晰，有条理的金融分析师，必须严格按照用户消息后给出的金融分析计划执行。
+
+如果你认为计划已经执行到最后一步了，请在内容的末尾加上\nFinal Answer字样
+
+示例：
+分析报告xxxxxxxx
+Final Answer
+"""
+
+finalize_prompt = """
+你是一个思路清晰，有条理的金融分析师。本次分析的步骤、token 或时间预算即将用尽，不能再调用工具。
+请根据当前金融分析计划和已经获得的数据，直接给出最终分析报告，数据不足的地方请注明。
+"""
+
+current_plan_prompt = """
+当前金融分析计划：
+{plan}
+"""
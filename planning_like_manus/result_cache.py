@@ -0,0 +1,80 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from tools.datasets import normalize_code
+
+
+def make_key(tool_name, stock_codes, **params):
+    """
+    生成缓存键：股票代码补齐6位、去重并排序，参数按名称排序
+
+    ['2461', '600600'] 与 ['600600', '002461'] 得到相同的键
+    """
+    codes = tuple(sorted({normalize_code(code) for code in stock_codes}))
+    return tool_name, codes, tuple(sorted(params.items()))
+
+
+class ResultCache:
+    """
+    带 TTL 和容量上限的异步结果缓存
+
+    同一个键的并发请求只会触发一次计算（single-flight），其余请求等待并共享结果；
+    计算失败（抛出异常或返回 None）的结果不缓存。
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (过期时间, 结果)
+        self._inflight = {}  # key -> 正在进行的计算任务
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key, compute):
+        """
+        命中缓存直接返回，否则执行 compute() 协程并缓存结果
+
+        计算放在独立任务中执行，某个调用方被取消不会影响其他等待同一结果的调用方
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        return await asyncio.shield(task)
+
+    def _on_done(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or task.result() is None:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, task.result())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,202 @@
+import functools
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from pydantic_core import to_json
+from tools.datasets import preload
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# 每个工具每 N 次调用估算一次响应大小（含第一次）
+SIZE_SAMPLE_EVERY = 10
+
+# 当前正在执行的工具名，用于把进程池里测得的分阶段耗时归属到工具
+current_tool = ContextVar("current_tool", default=None)
+
+
+def timed_call(func, *args):
+    """
+    在工作进程中执行 func 并分别计时
+
+    load 为数据集加载耗时（预热后接近 0），compute 为工具本身的计算耗时
+    """
+    start = time.perf_counter()
+    preload()
+    loaded = time.perf_counter()
+    result = func(*args)
+    return result, {"load": loaded - start, "compute": time.perf_counter() - loaded}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个桶为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """返回 (上界, 累计次数) 列表，符合 Prometheus 的 le 语义"""
+        total = 0
+        rows = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(bound): count for bound, count in self.cumulative()},
+        }
+
+
+class _ToolStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.phases = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+
+
+class ToolMetrics:
+    """
+    MCP 工具的调用次数、分阶段耗时、响应大小与并发统计
+
+    所有更新都发生在服务端事件循环线程中，无需加锁。响应大小是抽样估算值：
+    按 pydantic 的 JSON 编码计算，与 FastMCP 实际发送的字节数可能略有差异
+    """
+
+    def __init__(self, size_sample_every: int = SIZE_SAMPLE_EVERY):
+        self.size_sample_every = size_sample_every
+        self._tools = defaultdict(_ToolStats)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def instrument(self, func):
+        """装饰异步工具函数：统计调用、总耗时，并抽样估算响应字节数"""
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            stats = self._tools[name]
+            stats.calls += 1
+            stats.in_flight += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            token = current_tool.set(name)
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.latency.observe(time.perf_counter() - start)
+                stats.in_flight -= 1
+                self.in_flight -= 1
+                current_tool.reset(token)
+            if (stats.calls - 1) % self.size_sample_every == 0:
+                self._observe_size(stats, result)
+            return result
+
+        return wrapper
+
+    @staticmethod
+    def _observe_size(stats, result):
+        """估算响应大小；这里的任何失败都不影响工具调用本身"""
+        try:
+            stats.response_bytes.observe(len(to_json(result)))
+        except Exception:
+            pass
+
+    def observe_phase(self, tool, phase, seconds):
+        self._tools[tool].phases[phase].observe(seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "tools": {
+                name: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "in_flight": stats.in_flight,
+                    "latency_seconds": stats.latency.snapshot(),
+                    "phase_seconds": {phase: hist.snapshot()
+                                      for phase, hist in stats.phases.items()},
+                    "response_bytes": stats.response_bytes.snapshot(),
+                }
+                for name, stats in self._tools.items()
+            },
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        lines = [
+            "# HELP mcp_tool_calls_total Tool calls.",
+            "# TYPE mcp_tool_calls_total counter",
+        ]
+        lines += [f'mcp_tool_calls_total{{tool="{name}"}} {stats.calls}'
+                  for name, stats in self._tools.items()]
+        lines += [
+            "# HELP mcp_tool_errors_total Tool calls that raised.",
+            "# TYPE mcp_tool_errors_total counter",
+        ]
+        lines += [f'mcp_tool_errors_total{{tool="{name}"}} {stats.errors}'
+                  for name, stats in self._tools.items()]
+        lines += [
+            "# HELP mcp_tool_in_flight Tool calls currently executing.",
+            "# TYPE mcp_tool_in_flight gauge",
+        ]
+        lines += [f'mcp_tool_in_flight{{tool="{name}"}} {stats.in_flight}'
+                  for name, stats in self._tools.items()]
+        lines += [
+            "# HELP mcp_in_flight Tool calls currently executing across all tools.",
+            "# TYPE mcp_in_flight gauge",
+            f"mcp_in_flight {self.in_flight}",
+            "# HELP mcp_max_in_flight Peak concurrent tool calls since start.",
+            "# TYPE mcp_max_in_flight gauge",
+            f"mcp_max_in_flight {self.max_in_flight}",
+        ]
+
+        lines += [
+            "# HELP mcp_tool_latency_seconds End-to-end tool latency.",
+            "# TYPE mcp_tool_latency_seconds histogram",
+        ]
+        for name, stats in self._tools.items():
+            lines += _histogram_lines("mcp_tool_latency_seconds",
+                                      f'tool="{name}"', stats.latency)
+        lines += [
+            "# HELP mcp_tool_phase_seconds Tool latency by phase (load/compute).",
+            "# TYPE mcp_tool_phase_seconds histogram",
+        ]
+        for name, stats in self._tools.items():
+            for phase, hist in stats.phases.items():
+                lines += _histogram_lines("mcp_tool_phase_seconds",
+                                          f'tool="{name}",phase="{phase}"', hist)
+        lines += [
+            "# HELP mcp_tool_response_bytes Estimated JSON size of sampled tool responses.",
+            "# TYPE mcp_tool_response_bytes histogram",
+        ]
+        for name, stats in self._tools.items():
+            lines += _histogram_lines("mcp_tool_response_bytes",
+                                      f'tool="{name}"', stats.response_bytes)
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric, labels, hist):
+    lines = [f'{metric}_bucket{{{labels},le="{bound}"}} {count}'
+             for bound, count in hist.cumulative()]
+    lines.append(f"{metric}_sum{{{labels}}} {hist.sum}")
+    lines.append(f"{metric}_count{{{labels}}} {hist.count}")
+    return lines
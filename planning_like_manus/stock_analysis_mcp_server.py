@@ -1,23 +1,219 @@
-import pandas as pd
-from mcp.server.fastmcp import FastMCP
-from tools.read_local_financial_report import get_financial_report
-from tools.analysis_local_all_stock_price import analyze_stocks
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mcp.server.fastmcp import Context, FastMCP
+from pydantic import BaseModel, Field
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from result_cache import ResultCache, make_key
+from server_metrics import ToolMetrics, current_tool, timed_call
+from tools.datasets import normalize_code, preload
+from tools.read_local_financial_report import query_financial_report
+from tools.analysis_local_all_stock_price import (
+    END_DATE, START_DATE, run_batch_analysis, run_single_stock_metrics,
+    run_stock_analysis)
+
+# 工作进程数，可通过环境变量或 --workers 参数配置
+DEFAULT_WORKERS = int(os.environ.get("STOCK_MCP_WORKERS", os.cpu_count() or 1))
 
 # Create an MCP server
 mcp = FastMCP("stock-analysis-mcp")
 
+# 相同股票篮子的请求共享计算结果
+result_cache = ResultCache(
+    ttl=float(os.environ.get("STOCK_MCP_CACHE_TTL", 300)),
+    max_entries=int(os.environ.get("STOCK_MCP_CACHE_SIZE", 256)))
+
+# 各工具的调用次数、分阶段耗时、响应大小与并发
+metrics = ToolMetrics()
+
+# pandas/matplotlib 计算放在进程池中执行，避免阻塞 SSE 事件循环
+_pool = None
+_ready = threading.Event()
+
+
+def _init_worker():
+    """工作进程初始化：使用无界面的绘图后端并预加载数据集"""
+    import matplotlib
+    matplotlib.use("Agg")
+    preload()
+
+
+def _warmup():
+    """占位任务：短暂占住工作进程，返回其 PID 以确认该进程已完成初始化"""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _wait_for_workers(pool, max_workers, ready):
+    """反复提交占位任务，直到见到 max_workers 个不同的 PID 才标记就绪
+
+    同一批占位任务可能被少数进程全部取走，因此按 PID 逐个确认每个工作进程
+    """
+    pids = set()
+    try:
+        while len(pids) < max_workers:
+            futures = [pool.submit(_warmup) for _ in range(max_workers)]
+            pids.update(f.result() for f in futures)
+    except Exception as e:
+        print(f"工作进程预热失败: {e}")
+        return
+    ready.set()
+
+
+def start_workers(max_workers=DEFAULT_WORKERS):
+    """创建进程池并在后台预热，全部工作进程加载完数据后服务即就绪"""
+    global _pool, _ready
+    _pool = ProcessPoolExecutor(max_workers=max_workers,
+                                initializer=_init_worker)
+    _ready = threading.Event()
+    threading.Thread(target=_wait_for_workers, args=(_pool, max_workers, _ready),
+                     daemon=True).start()
+    return _pool
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def _financial_report(stock_codes):
+    """进程池中执行的财报查询：读取失败时抛出异常而不是返回 None，错误会传给调用方且不会被缓存"""
+    report = query_financial_report(stock_codes)
+    if report is None:
+        raise RuntimeError("读取财报数据失败")
+    return report
+
+
+async def _run_in_pool(func, *args):
+    if _pool is None:
+        start_workers()
+    loop = asyncio.get_running_loop()
+    result, phases = await loop.run_in_executor(_pool, timed_call, func, *args)
+    tool = current_tool.get()
+    if tool is not None:
+        for phase, seconds in phases.items():
+            metrics.observe_phase(tool, phase, seconds)
+    return result
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def readiness(request: Request) -> JSONResponse:
+    """就绪探针：数据集预热完成前返回 503"""
+    if is_ready():
+        return JSONResponse({"status": "ready"})
+    return JSONResponse({"status": "warming_up"}, status_code=503)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Prometheus 抓取端点"""
+    return PlainTextResponse(metrics.render_prometheus(),
+                             media_type="text/plain; version=0.0.4")
+
+
+@mcp.resource("metrics://tools")
+def tool_metrics() -> dict:
+    """各工具的调用次数、分阶段耗时直方图、响应大小与并发"""
+    return metrics.snapshot()
+
+
+@mcp.resource("stats://cache")
+def cache_stats() -> dict:
+    """结果缓存的命中/未命中/合并次数"""
+    return result_cache.stats()
+
+
 @mcp.tool()
-def get_financial_report_by_stocks(stock_codes : list[str]) -> dict:
+@metrics.instrument
+async def get_financial_report_by_stocks(stock_codes: list[str]) -> dict:
     """根据股票代码列表查询出财务报表数据"""
-    return get_financial_report.invoke({"stock_codes": stock_codes})
+    key = make_key("get_financial_report", stock_codes)
+
+    async def compute():
+        return await _run_in_pool(_financial_report, list(key[1]))
+
+    return await result_cache.get_or_compute(key, compute)
+
 
 @mcp.tool()
-def analyze_stocks_by_stocks(stock_codes : list[str]) -> pd.DataFrame:
+@metrics.instrument
+async def analyze_stocks_by_stocks(stock_codes: list[str]) -> list[dict]:
     """根据股票代码列表查询股票分析数据"""
-    return analyze_stocks.invoke({"stock_codes": stock_codes})
+    key = make_key("analyze_stocks", stock_codes)
+
+    async def compute():
+        results = await _run_in_pool(run_stock_analysis, list(key[1]))
+        return results.to_dict("records")
+
+    records = await result_cache.get_or_compute(key, compute)
+    # 缓存键按代码排序，返回前恢复调用方给出的顺序
+    by_code = {record["股票代码"]: record for record in records}
+    codes = dict.fromkeys(normalize_code(code) for code in stock_codes)
+    return [by_code[code] for code in codes if code in by_code]
+
+
+@mcp.tool()
+@metrics.instrument
+async def analyze_stocks_streaming(stock_codes: list[str], ctx: Context) -> list[dict]:
+    """根据股票代码列表逐只计算股票分析数据，每算完一只立即以进度通知推送该股票的指标（不生成走势图）"""
+    codes = list(dict.fromkeys(normalize_code(code) for code in stock_codes))
+
+    async def analyze_one(code):
+        try:
+            return code, await _run_in_pool(run_single_stock_metrics, code), None
+        except Exception as e:
+            return code, None, str(e)
+
+    results = {}
+    tasks = [analyze_one(code) for code in codes]
+    for done, task in enumerate(asyncio.as_completed(tasks), 1):
+        code, values, error = await task
+        if values is not None:
+            results[code] = values
+            partial = {"股票代码": code, "metrics": values}
+        else:
+            partial = {"股票代码": code, "error": error or "未找到股票或数据不足"}
+        message = json.dumps(partial, ensure_ascii=False, default=str)
+        # 进度通知只发给携带 progressToken 的客户端，日志通知作为兜底
+        await ctx.report_progress(done, len(codes), message=message)
+        await ctx.info(message)
+
+    if not results:
+        raise ValueError("没有找到任何有效的股票数据")
+    return [results[code] for code in codes if code in results]
+
+
+class StockQuery(BaseModel):
+    stock_codes: list[str] = Field(description="股票代码列表")
+    start_date: str = Field(default=START_DATE, description="起始日期，如 20240422")
+    end_date: str = Field(default=END_DATE, description="结束日期，如 20250422")
+    metrics: list[str] | None = Field(
+        default=None,
+        description="需要的指标：起始价格, 结束价格, 区间涨跌幅(%), 最大回撤(%), 年化波动率(%)；为空返回全部")
+
+
+@mcp.tool()
+@metrics.instrument
+async def analyze_stocks_batch(queries: list[StockQuery]) -> list[dict]:
+    """一次执行多组股票分析查询（不同股票篮子/日期区间/指标），按查询顺序返回全部结果"""
+    return await _run_in_pool(
+        run_batch_analysis, [query.model_dump() for query in queries])
+
 
 # Add this code to run the server with SSE enabled
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stock Analysis MCP Server")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="number of worker processes for pandas/matplotlib tools")
+    args = parser.parse_args()
+
+    start_workers(args.workers)
+    print(f"Stock Analysis MCP Server running with SSE enabled on port 8000 "
+          f"({args.workers} workers, GET /ready for readiness)")
     # Start the server with SSE enabled
     mcp.run(transport="sse")
-    print("Stock Analysis MCP Server running with SSE enabled on port 8000")
@@ -0,0 +1,53 @@
+import io
+import json
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from batch_runner import read_questions, run_batch
+
+
+def test_read_questions(tmp_path):
+    path = tmp_path / "questions.txt"
+    path.write_text("# nightly baskets\n"
+                    "对比 '600600', '002461'\n"
+                    "\n"
+                    '{"id": "b2", "question": "分析 000729"}\n', encoding="utf-8")
+    assert read_questions(path) == [
+        {"id": 0, "question": "对比 '600600', '002461'"},
+        {"id": "b2", "question": "分析 000729"},
+    ]
+
+
+def test_run_batch_bounded_concurrency_and_errors():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def answer(inputs):
+        nonlocal active, peak
+        question = inputs["messages"][0].content
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        if question == "bad":
+            raise ValueError("boom")
+        return {"messages": [AIMessage(content=f"answer {question}")]}
+
+    items = [{"id": i, "question": q} for i, q in enumerate(["a", "b", "bad", "c", "d"])]
+    output = io.StringIO()
+    records = run_batch(items, RunnableLambda(answer), output, concurrency=2)
+
+    assert peak == 2
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(lines) == len(records) == 5
+    by_id = {record["id"]: record for record in lines}
+    assert by_id[0]["answer"] == "answer a"
+    assert by_id[2]["answer"] is None and "boom" in by_id[2]["error"]
+    assert all(record["elapsed_s"] >= 0.05 for record in lines)
+    assert all("budget" in record for record in lines)
@@ -0,0 +1,37 @@
+import pandas as pd
+from langchain_core.messages import ToolMessage
+from observation import compact_observation, full_observation, to_compact_table
+
+
+def test_financial_report_is_flattened_into_one_table():
+    report = {
+        "600600": {"data": [{"Unnamed: 0": 3, "序号": 1, "股票代码": "600600", "每股收益": 1.23456}]},
+        "000729": {"data": []},
+    }
+    text = to_compact_table(report)
+    assert text.splitlines()[0] == "股票代码,每股收益"
+    assert "600600,1.235" in text
+    assert "无数据的股票: 000729" in text
+
+
+def test_numbers_are_rounded_per_column():
+    df = pd.DataFrame({"股票代码": ["600600", "002461"], "结束价格": [10.997, 8.0],
+                       "区间涨跌幅(%)": [12.3456, -3.0], "营业总收入": [123456789.0, 0.0]})
+    lines = to_compact_table(df).splitlines()
+    assert lines[1] == "600600,10.997,12.35,123456789"
+    assert lines[2] == "002461,8.0,-3.0,0"
+
+
+def test_large_observation_is_truncated_with_row_counts():
+    df = pd.DataFrame({"股票代码": [f"{i:06d}" for i in range(2000)], "收盘": range(2000)})
+    text = compact_observation(df, budget=200)
+    assert len(text) < len(df.to_csv(index=False))
+    assert "共 2001 行" in text
+
+
+def test_small_observation_is_kept_whole_and_retrievable():
+    df = pd.DataFrame([{"股票代码": "600600", "区间涨跌幅(%)": 1.5}])
+    content = compact_observation(df)
+    assert "截断" not in content
+    messages = [ToolMessage(content=content, artifact=df, tool_call_id="call_2")]
+    assert full_observation(messages, "call_2") is df
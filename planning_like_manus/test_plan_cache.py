@@ -0,0 +1,37 @@
+from plan_cache import PlanCache, normalize_question
+
+QUESTION = "对比一下 '600600', '002461', '000729', '600573' 这四只股票的股价表现和财务情况，哪家更值得投资"
+PLAN = """1. 调用 get_financial_report 获取 600600、002461、000729、600573 的财报数据
+2. 调用 analyze_stocks 获取 600600、002461、000729、600573 的股价表现
+3. 综合对比并给出投资建议"""
+
+
+def test_questions_with_different_codes_share_a_template():
+    other = "对比一下 '300054', '600698', '000001', '601318' 这四只股票的股价表现和财务情况，哪家更值得投资"
+    assert normalize_question(QUESTION)[0] == normalize_question(other)[0]
+    assert normalize_question(other)[1] == [["300054", "600698", "000001", "601318"]]
+
+
+def test_cached_plan_is_reinstantiated_for_new_codes():
+    cache = PlanCache()
+    assert cache.get(QUESTION) is None
+    assert cache.put(QUESTION, PLAN)
+
+    plan = cache.get("对比一下 '300054', '600698', '000001', '601318' 这四只股票的股价表现和财务情况，哪家更值得投资")
+    assert "300054、600698、000001、601318 的财报数据" in plan
+    assert "600600" not in plan
+    assert cache.stats()["hits"] == 1
+
+
+def test_dates_are_abstracted():
+    cache = PlanCache()
+    cache.put("分析 600600 在 20240101 到 20241231 的走势", "1. 分析 600600 从 20240101 至 20241231 的涨跌幅")
+    plan = cache.get("分析 000729 在 20250101 到 20250401 的走势")
+    assert plan == "1. 分析 000729 从 20250101 至 20250401 的涨跌幅"
+
+
+def test_plan_listing_codes_individually_is_not_cached():
+    cache = PlanCache()
+    plan = "1. 获取 600600 的财报\n2. 获取 002461 的财报"
+    assert not cache.put("对比 600600、002461", plan)
+    assert cache.stats()["uncacheable"] == 1
@@ -0,0 +1,46 @@
+import time
+
+import pytest
+from langchain_core.tools import tool
+from plan_dag import PlanStep, StructuredPlan, execute_plan, topological_waves
+
+
+@tool
+def slow_tool(stock_codes: list):
+    """Sleeps, then echoes the codes"""
+    time.sleep(0.2)
+    return stock_codes
+
+
+PLAN = StructuredPlan(steps=[
+    PlanStep(id="s1", description="财报", tool="slow_tool", args={"stock_codes": ["600600"]}),
+    PlanStep(id="s2", description="股价", tool="slow_tool", args={"stock_codes": ["002461"]}),
+    PlanStep(id="s3", description="结论", depends_on=["s1", "s2"]),
+])
+
+
+def test_waves_group_independent_steps():
+    waves = topological_waves(PLAN.steps)
+    assert [[step.id for step in wave] for wave in waves] == [["s1", "s2"], ["s3"]]
+
+
+def test_cycles_and_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError):
+        topological_waves([PlanStep(id="a", description="", depends_on=["b"]),
+                           PlanStep(id="b", description="", depends_on=["a"])])
+    with pytest.raises(ValueError):
+        topological_waves([PlanStep(id="a", description="", depends_on=["missing"])])
+
+
+def test_tool_steps_run_in_parallel_and_only_synthesis_uses_llm():
+    calls = []
+
+    def synthesize(step, dependency_results):
+        calls.append(dependency_results)
+        return "结论"
+
+    start = time.perf_counter()
+    results = execute_plan(PLAN, {"slow_tool": slow_tool}, synthesize)
+    assert time.perf_counter() - start < 0.35
+    assert results == {"s1": ["600600"], "s2": ["002461"], "s3": "结论"}
+    assert calls == [{"s1": ["600600"], "s2": ["002461"]}]
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).parent
+
+
+def test_import_is_side_effect_free_and_light():
+    """Importing the module must not build LLM clients, write files or pull in pandas/matplotlib"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import planning_agent\n"
+        "print(time.perf_counter() - start)\n"
+        "print(','.join(m for m in ('pandas', 'matplotlib', 'langchain_openai') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    elapsed, heavy = result.stdout.splitlines()[-2:]
+    print(f"import planning_agent: {float(elapsed):.2f}s")
+    assert heavy == ""
+
+
+def test_agent_is_built_lazily_without_api_keys():
+    from planning_agent import get_agent, get_models
+
+    agent = get_agent()
+    assert set(agent.get_graph().nodes) >= {"plan_node", "llm_call", "environment"}
+    assert get_models.cache_info().currsize == 0
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from result_cache import ResultCache, make_key
+
+
+def test_make_key_normalizes_codes():
+    """Codes are zero-padded, deduplicated and sorted"""
+    assert make_key("t", ["600600", "2461"]) == make_key("t", ["002461", "600600", "2461"])
+    assert make_key("t", ["600600"], start="a") != make_key("t", ["600600"], start="b")
+
+
+def test_concurrent_requests_share_one_computation():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": 42}
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r == {"value": 42} for r in results)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_hit_after_compute_and_ttl_expiry():
+    cache = ResultCache(ttl=0.05)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await cache.get_or_compute("k", compute)
+        second = await cache.get_or_compute("k", compute)
+        await asyncio.sleep(0.06)
+        third = await cache.get_or_compute("k", compute)
+        return first, second, third
+
+    assert asyncio.run(main()) == (1, 1, 2)
+    assert cache.stats()["hits"] == 1
+
+
+def test_size_bound_and_errors_not_cached():
+    cache = ResultCache(max_entries=2)
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def main():
+        for key in ("a", "b", "c"):
+            await cache.get_or_compute(key, lambda: asyncio.sleep(0, result=key))
+        with pytest.raises(ValueError):
+            await cache.get_or_compute("d", fail)
+
+    asyncio.run(main())
+    assert cache.stats()["entries"] == 2
+
+
+def test_none_result_is_not_cached():
+    cache = ResultCache()
+    results = [None, {"value": 1}]
+
+    async def compute():
+        return results.pop(0)
+
+    async def main():
+        return [await cache.get_or_compute("k", compute) for _ in range(2)]
+
+    assert asyncio.run(main()) == [None, {"value": 1}]
+    assert cache.stats()["misses"] == 2
@@ -1,121 +1,186 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
-import matplotlib as mpl
-import numpy as np
 from langchain_core.tools import tool
+from tools.datasets import OUTPUT_DIR, load_price_history, normalize_code
 
+# pandas/numpy/matplotlib 在工具真正执行时才导入，导入本模块（绑定工具 schema）保持轻量
 
-@tool
-def analyze_stocks(stock_codes):
+
+START_DATE = '20240422'
+END_DATE = '20250422'
+
+# 可选的分析指标
+METRICS = ['起始价格', '结束价格', '区间涨跌幅(%)', '最大回撤(%)', '年化波动率(%)']
+
+
+def compute_stock_metrics(stock_data, stock_code, start_date, end_date):
     """
-    根据股票代码列表获取股票的起始价格，结束价格，区间涨跌幅，最大回撤，年化波动率
+    计算单只股票在日期区间内的起始价格，结束价格，区间涨跌幅，最大回撤，年化波动率
 
     Parameters:
     -----------
-    stock_codes : list
-        股票代码列表
+    stock_data : DataFrame
+        该股票按日期升序排列的日线数据
+    stock_code : str
+        股票代码
+    start_date, end_date : Timestamp
+        日期区间
+
+    Returns:
+    --------
+    tuple
+        (指标字典, 区间内的日线数据)，数据不足时返回 None
     """
+    import numpy as np
+
+    # 筛选日期范围
+    stock_data = stock_data[(stock_data['日期'] >= start_date) & (
+            stock_data['日期'] <= end_date)].copy()
+
+    if len(stock_data) < 2:  # 确保至少有两条数据
+        print(f"警告: 在指定日期范围内数据不足: {stock_code}")
+        return None
+
+    # 计算日收益率
+    stock_data['日收益率'] = stock_data['收盘'].pct_change()
+
+    # 计算年化波动率 (假设一年252个交易日)
+    volatility = stock_data['日收益率'].std() * np.sqrt(252) * 100
+
+    # 计算关键指标
+    start_price = stock_data.iloc[0]['收盘']
+    end_price = stock_data.iloc[-1]['收盘']
+    total_return = (end_price - start_price) / start_price * 100
+
+    # 计算最大回撤
+    stock_data['max_price'] = stock_data['收盘'].cummax()
+    stock_data['min_price'] = stock_data['收盘'].cummin()
+    stock_data['drawdown'] = (stock_data['max_price'] - stock_data[
+        'min_price']) / stock_data['max_price'] * 100
+    max_drawdown = stock_data['drawdown'].max()
+
+    metrics = {
+        '股票代码': stock_code,
+        '起始价格': start_price,
+        '结束价格': end_price,
+        '区间涨跌幅(%)': total_return,
+        '最大回撤(%)': max_drawdown,
+        '年化波动率(%)': volatility
+    }
+    return metrics, stock_data
+
+
+def plot_stock_prices(plotted, start_date, end_date, output_path):
+    """
+    绘制股价走势图并保存
+
+    不经过 pyplot 的全局状态，多个线程/进程同时绘图互不干扰
 
-    start_date = '20240422'
-    end_date = '20250422'
+    Parameters:
+    -----------
+    plotted : list
+        (指标字典, 区间内的日线数据) 列表
+    """
+    import matplotlib as mpl
+    from matplotlib.figure import Figure
 
     # 设置中文字体
-    plt.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei',
+    mpl.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei',
                                        'Arial Unicode MS']
-    plt.rcParams['axes.unicode_minus'] = False
+    mpl.rcParams['axes.unicode_minus'] = False
     mpl.rcParams['font.family'] = 'sans-serif'
 
-    # 读取数据
-    data_path = os.path.join('/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus/akshare',
-                             'all_data.csv')
-    df = pd.read_csv(data_path)
+    fig = Figure(figsize=(15, 8))
+    ax = fig.add_subplot()
+
+    for metrics, stock_data in plotted:
+        stock_code = metrics['股票代码']
+        start_price = metrics['起始价格']
+        end_price = metrics['结束价格']
+        max_drawdown = metrics['最大回撤(%)']
+
+        # 绘制股价走势图
+        ax.plot(stock_data['日期'], stock_data['收盘'], label=f'{stock_code}')
+
+        # 添加关键价格标注
+        ax.annotate(f'{stock_code} 起始价: {start_price:.2f}',
+                    xy=(stock_data['日期'].iloc[0], start_price),
+                    xytext=(10, 10), textcoords='offset points')
+        ax.annotate(f'{stock_code} 结束价: {end_price:.2f}',
+                    xy=(stock_data['日期'].iloc[-1], end_price),
+                    xytext=(10, -10), textcoords='offset points')
+
+        # 标注最大回撤点
+        max_drawdown_idx = stock_data['drawdown'].idxmax()
+        if max_drawdown_idx is not None and max_drawdown_idx in stock_data.index:
+            ax.annotate(f'{stock_code} 最大回撤: {max_drawdown:.2f}%',
+                        xy=(stock_data.loc[max_drawdown_idx, '日期'],
+                            stock_data.loc[max_drawdown_idx, '收盘']),
+                        xytext=(10, -10), textcoords='offset points')
 
-    # 转换日期格式
-    df['日期'] = pd.to_datetime(df['日期'])
+    # 完善图表
+    ax.set_title(
+        f'股价走势图 ({start_date.strftime("%Y-%m-%d")} 至 {end_date.strftime("%Y-%m-%d")})')
+    ax.set_xlabel('日期')
+    ax.set_ylabel('价格')
+    ax.grid(True)
+    ax.legend()
 
-    # 创建结果列表
-    all_results = []
+    # 调整x轴日期显示
+    fig.autofmt_xdate()
 
-    # 创建图表
-    plt.figure(figsize=(15, 8))
+    # 保存图表
+    fig.savefig(output_path, dpi=300, bbox_inches='tight')
+
+
+def run_stock_analysis(stock_codes, start_date=START_DATE, end_date=END_DATE, output_dir=None):
+    """
+    analyze_stocks 的实现，普通函数便于在进程池中执行
+
+    Parameters:
+    -----------
+    output_dir : str, optional
+        指定时把结果表 stocks_analysis.csv 和走势图 stocks_price_chart.png 写入该目录；
+        默认不写文件，工具调用方只使用返回的数据
+
+    Returns:
+    --------
+    DataFrame
+        包含每个股票代码对应的起始价格，结束价格，区间涨跌幅，最大回撤，年化波动率
+    """
+    import pandas as pd
+
+    # 读取数据（进程内缓存）
+    history = load_price_history()
 
     # 转换日期参数
     start_date = pd.to_datetime(start_date)
     end_date = pd.to_datetime(end_date)
 
+    # 创建结果列表
+    all_results = []
+    plotted = []
+
     # 为每个股票代码进行分析
     for stock_code in stock_codes:
         try:
-            # 筛选股票数据
             print("------stock_code-------")
             print(stock_code)
             print("------------------")
-            stock_data = df[
-                df['股票代码'].astype(str).str.zfill(6) == stock_code].copy()
+            stock_code = normalize_code(stock_code)
+            stock_data = history.get(stock_code)
 
-            if stock_data.empty:
+            if stock_data is None:
                 print(f"警告: 未找到股票: {stock_code}")
                 continue
 
-            # 筛选日期范围
-            stock_data = stock_data[(stock_data['日期'] >= start_date) & (
-                    stock_data['日期'] <= end_date)]
-
-            if len(stock_data) < 2:  # 确保至少有两条数据
-                print(f"警告: 在指定日期范围内数据不足: {stock_code}")
+            computed = compute_stock_metrics(stock_data, stock_code,
+                                             start_date, end_date)
+            if computed is None:
                 continue
 
-            # 按日期排序
-            stock_data = stock_data.sort_values('日期')
-
-            # 计算日收益率
-            stock_data['日收益率'] = stock_data['收盘'].pct_change()
-
-            # 计算年化波动率 (假设一年252个交易日)
-            volatility = stock_data['日收益率'].std() * np.sqrt(252) * 100
-
-            # 计算关键指标
-            start_price = stock_data.iloc[0]['收盘']
-            end_price = stock_data.iloc[-1]['收盘']
-            total_return = (end_price - start_price) / start_price * 100
-
-            # 计算最大回撤
-            stock_data['max_price'] = stock_data['收盘'].cummax()
-            stock_data['min_price'] = stock_data['收盘'].cummin()
-            stock_data['drawdown'] = (stock_data['max_price'] - stock_data[
-                'min_price']) / stock_data['max_price'] * 100
-            max_drawdown = stock_data['drawdown'].max()
-
             # 添加到结果列表
-            all_results.append({
-                '股票代码': stock_code,
-                '起始价格': start_price,
-                '结束价格': end_price,
-                '区间涨跌幅(%)': total_return,
-                '最大回撤(%)': max_drawdown,
-                '年化波动率(%)': volatility
-            })
-
-            # 绘制股价走势图
-            plt.plot(stock_data['日期'], stock_data['收盘'],
-                     label=f'{stock_code}')
-
-            # 添加关键价格标注
-            plt.annotate(f'{stock_code} 起始价: {start_price:.2f}',
-                         xy=(stock_data['日期'].iloc[0], start_price),
-                         xytext=(10, 10), textcoords='offset points')
-            plt.annotate(f'{stock_code} 结束价: {end_price:.2f}',
-                         xy=(stock_data['日期'].iloc[-1], end_price),
-                         xytext=(10, -10), textcoords='offset points')
-
-            # 标注最大回撤点
-            max_drawdown_idx = stock_data['drawdown'].idxmax()
-            if max_drawdown_idx is not None and max_drawdown_idx in stock_data.index:
-                plt.annotate(f'{stock_code} 最大回撤: {max_drawdown:.2f}%',
-                             xy=(stock_data.loc[max_drawdown_idx, '日期'],
-                                 stock_data.loc[max_drawdown_idx, '收盘']),
-                             xytext=(10, -10), textcoords='offset points')
+            all_results.append(computed[0])
+            plotted.append(computed)
 
         except Exception as e:
             print(f"处理股票 {stock_code} 时出错: {str(e)}")
@@ -127,39 +192,136 @@ def analyze_stocks(stock_codes):
     # 创建结果DataFrame
     results = pd.DataFrame(all_results)
 
-    # 保存结果到CSV
-    output_dir = os.path.join('/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus', 'output')
-    os.makedirs(output_dir, exist_ok=True)
-    results.to_csv(os.path.join(output_dir, 'stocks_analysis.csv'), index=False,
-                   encoding='utf-8-sig')
+    # 按需保存结果CSV和走势图
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        results.to_csv(os.path.join(output_dir, 'stocks_analysis.csv'), index=False,
+                       encoding='utf-8-sig')
+        plot_stock_prices(plotted, start_date, end_date,
+                          os.path.join(output_dir, 'stocks_price_chart.png'))
 
-    # 完善图表
-    plt.title(
-        f'股价走势图 ({start_date.strftime("%Y-%m-%d")} 至 {end_date.strftime("%Y-%m-%d")})')
-    plt.xlabel('日期')
-    plt.ylabel('价格')
-    plt.grid(True)
-    plt.legend()
+    return results
 
-    # 调整x轴日期显示
-    plt.gcf().autofmt_xdate()
 
-    # 保存图表
-    plt.savefig(os.path.join(output_dir, 'stocks_price_chart.png'), dpi=300,
-                bbox_inches='tight')
-    plt.close()
+def run_single_stock_metrics(stock_code, start_date=START_DATE, end_date=END_DATE):
+    """
+    只计算单只股票的指标，不绘图，供流式接口逐只提交到进程池
 
-    return results
+    Returns:
+    --------
+    dict
+        指标字典，未找到股票或数据不足时返回 None
+    """
+    import pandas as pd
+
+    stock_code = normalize_code(stock_code)
+    stock_data = load_price_history().get(stock_code)
+    if stock_data is None:
+        print(f"警告: 未找到股票: {stock_code}")
+        return None
+
+    computed = compute_stock_metrics(stock_data, stock_code,
+                                     pd.to_datetime(start_date),
+                                     pd.to_datetime(end_date))
+    return None if computed is None else computed[0]
+
+
+def run_batch_analysis(queries):
+    """
+    在同一份数据上批量执行多个分析查询
+
+    所有查询涉及的股票只按整体日期窗口筛选一次，相同的 (股票, 起止日期) 只计算一次
+
+    Parameters:
+    -----------
+    queries : list
+        查询列表，每个查询为包含 stock_codes, start_date, end_date, metrics 的字典，
+        metrics 为空表示返回全部指标
+
+    Returns:
+    --------
+    list
+        与 queries 一一对应的结果，包含 results（指标记录列表）、missing（无数据的股票）或 error
+    """
+    import pandas as pd
+
+    if not queries:
+        return []
+    history = load_price_history()
+
+    parsed = []
+    for query in queries:
+        codes = list(dict.fromkeys(
+            normalize_code(code) for code in query['stock_codes']))
+        start_date = pd.to_datetime(query.get('start_date') or START_DATE)
+        end_date = pd.to_datetime(query.get('end_date') or END_DATE)
+        parsed.append((codes, start_date, end_date, query.get('metrics')))
+
+    # 共享筛选：每只股票只按所有查询的整体日期窗口切一次
+    window_start = min(p[1] for p in parsed)
+    window_end = max(p[2] for p in parsed)
+    windows = {}
+    for code in {code for p in parsed for code in p[0]}:
+        stock_data = history.get(code)
+        if stock_data is not None:
+            windows[code] = stock_data[(stock_data['日期'] >= window_start) & (
+                    stock_data['日期'] <= window_end)]
+
+    computed = {}
+    batch_results = []
+    for codes, start_date, end_date, metrics in parsed:
+        unknown = [m for m in metrics or [] if m not in METRICS]
+        if unknown:
+            batch_results.append({
+                'error': f"不支持的指标: {unknown}，可选指标: {METRICS}"})
+            continue
+        columns = ['股票代码'] + (metrics or METRICS)
+
+        records = []
+        missing = []
+        for code in codes:
+            key = (code, start_date, end_date)
+            if key not in computed:
+                stock_data = windows.get(code)
+                result = None if stock_data is None else compute_stock_metrics(
+                    stock_data, code, start_date, end_date)
+                computed[key] = None if result is None else result[0]
+            if computed[key] is None:
+                missing.append(code)
+            else:
+                records.append({c: computed[key][c] for c in columns})
+
+        batch_results.append({
+            'start_date': start_date.strftime('%Y%m%d'),
+            'end_date': end_date.strftime('%Y%m%d'),
+            'results': records,
+            'missing': missing,
+        })
+    return batch_results
+
+
+@tool
+def analyze_stocks(stock_codes):
+    """
+    根据股票代码列表获取股票的起始价格，结束价格，区间涨跌幅，最大回撤，年化波动率
+
+    Parameters:
+    -----------
+    stock_codes : list
+        股票代码列表
+    """
+    return run_stock_analysis(stock_codes)
 
 
 if __name__ == '__main__':
     # 示例使用
     try:
         stock_codes = ['600600', '300054', '600698', '600573']  # 可以替换为您想要分析的股票代码列表
-        # Use invoke method instead of direct call
-        results = analyze_stocks.invoke({"stock_codes": stock_codes})
+        # 直接运行时把结果表和走势图写入 OUTPUT_DIR
+        results = run_stock_analysis(stock_codes, output_dir=OUTPUT_DIR)
         print("\n分析结果:")
         print(results)
+        print(f"结果表和走势图已保存到: {OUTPUT_DIR}")
     except Exception as e:
         print(f"错误: {str(e)}")
 
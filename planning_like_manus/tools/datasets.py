@@ -0,0 +1,50 @@
+import os
+from functools import lru_cache
+
+# 本地 akshare 数据目录，可通过环境变量覆盖
+DATA_DIR = os.environ.get(
+    "STOCK_DATA_DIR",
+    '/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus/akshare')
+OUTPUT_DIR = os.environ.get(
+    "STOCK_OUTPUT_DIR",
+    '/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus/output')
+
+
+def normalize_code(code) -> str:
+    """股票代码统一为6位字符串"""
+    return str(code).zfill(6)
+
+
+@lru_cache(maxsize=None)
+def load_price_history() -> dict:
+    """
+    读取全部日线数据并按股票代码分组，进程内只加载一次
+
+    Returns:
+    --------
+    dict
+        股票代码 -> 按日期升序排列的日线 DataFrame
+    """
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(DATA_DIR, 'all_data.csv'))
+    df['日期'] = pd.to_datetime(df['日期'])
+    df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
+    return {code: frame.sort_values('日期')
+            for code, frame in df.groupby('股票代码', sort=False)}
+
+
+@lru_cache(maxsize=None)
+def load_financial_report():
+    """读取财报数据，进程内只加载一次"""
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(DATA_DIR, 'financial_report.csv'))
+    df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
+    return df
+
+
+def preload():
+    """预热：提前加载所有数据集，避免首个请求承担冷启动开销"""
+    load_price_history()
+    load_financial_report()
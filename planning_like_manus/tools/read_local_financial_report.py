@@ -1,34 +1,20 @@
 from langchain_core.tools import tool
-import pandas as pd
 import os
+from tools.datasets import DATA_DIR, load_financial_report, normalize_code
 
 
-@tool
-def get_financial_report(stock_codes):
+def query_financial_report(stock_codes):
     """
-    根据股票代码列表获取财报数据
-
-    Parameters:
-    -----------
-    stock_codes : list
-        股票代码列表
+    get_financial_report 的实现，普通函数便于在进程池中执行
 
     Returns:
     --------
     dict
         包含每个股票代码对应的财报数据的字典
     """
-    # 确保数据目录存在
-    data_dir = '/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus/akshare'
-    os.makedirs(data_dir, exist_ok=True)
-
     try:
-        # 读取CSV文件
-        df = pd.read_csv(os.path.join(data_dir, 'financial_report.csv'))
-        print("从本地文件读取数据成功")
-
-        # 确保股票代码列是字符串类型
-        df['股票代码'] = df['股票代码'].astype(str).str.zfill(6)
+        # 读取CSV文件（进程内缓存，股票代码已统一为6位字符串）
+        df = load_financial_report()
 
         # 创建结果字典
         result = {}
@@ -36,7 +22,7 @@ def get_financial_report(stock_codes):
         # 为每个股票代码获取数据
         for code in stock_codes:
             # 确保股票代码格式一致（6位数字）
-            code = str(code).zfill(6)
+            code = normalize_code(code)
             # 筛选该股票的数据
             stock_data = df[df['股票代码'] == code]
 
@@ -57,13 +43,30 @@ def get_financial_report(stock_codes):
         return None
 
 
+@tool
+def get_financial_report(stock_codes):
+    """
+    根据股票代码列表获取财报数据
+
+    Parameters:
+    -----------
+    stock_codes : list
+        股票代码列表
+
+    Returns:
+    --------
+    dict
+        包含每个股票代码对应的财报数据的字典
+    """
+    return query_financial_report(stock_codes)
+
+
 def load_data():
     import akshare as ak
-    import pandas as pd
 
     df = ak.stock_yjbb_em(date="20241231")
 
-    df.to_csv('/Users/fengshiyi/Downloads/shayne/learning/LLM/py-projects/langGraph-demo/test_data/planning_like_manus/akshare/'+'financial_report.csv')
+    df.to_csv(os.path.join(DATA_DIR, 'financial_report.csv'))
 
 
 # 示例使用
@@ -1,10 +1,13 @@
+import argparse
 import json
 import asyncio
+import sys
 from datetime import datetime
+from pathlib import Path
 
-from langchain_openai import ChatOpenAI
 from langchain_tavily import TavilySearch
 from langgraph.graph import StateGraph, MessagesState, END, START
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 
 from openevals.llm import create_async_llm_as_judge
@@ -12,18 +15,17 @@ from openevals.prompts import (
     RAG_RETRIEVAL_RELEVANCE_PROMPT,
     RAG_HELPFULNESS_PROMPT,
 )
-import os
 from dotenv import load_dotenv
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.accounting import account_run
+from shared.budget import BudgetGovernor, drop_pending_tool_calls, get_budget
+from shared.clients import chat_model
+
 # Load environment variables from .env
 load_dotenv()
 
-model = ChatOpenAI(
-    model="deepseek-chat",
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
+model = chat_model("deepseek-chat", temperature=0.0)
 current_date = datetime.now().strftime("%A, %B %d, %Y")
 
 MAX_SEARCH_RETRIES = 5
@@ -51,6 +53,11 @@ SYSTEM_PROMPT = """
 Use the provided web search tool to find the latest information if you are not sure of what the user is asking for.
 """
 
+FINALIZE_PROMPT = """
+The step, token or time budget for this question is nearly used up and no more searches are possible.
+Answer the user's original question as well as you can using only the conversation so far, and say what could not be verified.
+"""
+
 
 # Simplify the Tavily search tool's input schema for a small local model
 @tool
@@ -68,18 +75,16 @@ async def relevance_filter(state: GraphState):
         search_results = json.loads(last_message.content).get("results", [])
         filtered_results = []
 
-        # Create a semaphore to limit concurrent tasks to 2
-        semaphore = asyncio.Semaphore(2)
-
-        async def evaluate_with_semaphore(result):
-            async with semaphore:
-                eval_result = await relevance_evaluator(
-                    inputs=state["attempted_search_queries"][-1], context=result
-                )
-                return result, eval_result
+        # Concurrency is bounded by the shared adaptive limiter in the LLM client
+        # (shared/limiter.py), which backs off on 429/5xx instead of a fixed cap
+        async def evaluate(result):
+            eval_result = await relevance_evaluator(
+                inputs=state["attempted_search_queries"][-1], context=result
+            )
+            return result, eval_result
 
         # Create tasks for all results
-        tasks = [evaluate_with_semaphore(result) for result in search_results]
+        tasks = [evaluate(result) for result in search_results]
 
         # Process tasks as they complete
         for completed_task in asyncio.as_completed(tasks):
@@ -94,9 +99,12 @@ async def relevance_filter(state: GraphState):
             f"Relevance filter node must be called after web search")
 
 
-async def should_continue(state: GraphState):
+async def should_continue(state: GraphState, config):
     if len(state["attempted_search_queries"]) > MAX_SEARCH_RETRIES:
         return END
+    budget = get_budget(config)
+    if budget is not None and budget.should_finalize():
+        return "finalize"
     messages = state["messages"]
     last_message = messages[-1]
     if last_message.tool_calls:
@@ -119,6 +127,13 @@ async def call_model(state: GraphState):
     return {"messages": [response]}
 
 
+async def finalize(state: GraphState):
+    messages = [{"role": "system", "content": FINALIZE_PROMPT}] + drop_pending_tool_calls(
+        state["messages"])
+    response = await model.ainvoke(messages)
+    return {"messages": [response]}
+
+
 async def web_search(state: GraphState):
     last_message = state["messages"][-1]
     search_results = await search_tool.ainvoke(last_message.tool_calls[0])
@@ -167,8 +182,11 @@ As a reminder, check the previous conversation history and fetched context caref
     return {}
 
 
-async def retry_or_end(state: GraphState):
+async def retry_or_end(state: GraphState, config):
     if state["messages"][-1].type == "human":
+        budget = get_budget(config)
+        if budget is not None and budget.should_finalize():
+            return "finalize"
         return "agent"
     return END
 
@@ -186,18 +204,44 @@ workflow.add_node("agent", call_model)
 workflow.add_node("web_search", web_search)
 workflow.add_node("relevance_filter", relevance_filter)
 workflow.add_node("reflect", reflect)
+workflow.add_node("finalize", finalize)
 
 workflow.add_edge(START, "store_original_question")
 workflow.add_edge("store_original_question", "agent")
 workflow.add_conditional_edges("agent", should_continue,
-                               ["web_search", "reflect", END])
+                               ["web_search", "reflect", "finalize", END])
 workflow.add_edge("web_search", "relevance_filter")
 workflow.add_edge("relevance_filter", "agent")
 workflow.add_conditional_edges(
     "reflect",
     retry_or_end,
-    ["agent", END],
+    ["agent", "finalize", END],
 )
+workflow.add_edge("finalize", END)
 
 agent = workflow.compile()
 
+
+async def run_agent(question: str, config=None):
+    # Per-node LLM calls, tokens and latency (agent, relevance_filter, reflect...)
+    with account_run() as accounting:
+        result = await agent.ainvoke({"messages": [HumanMessage(content=question)]}, config)
+    return result, accounting
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corrective RAG agent with reflection")
+    parser.add_argument("question", help="question to research and answer")
+    parser.add_argument("--max-steps", type=int, help="maximum node steps")
+    parser.add_argument("--deadline", type=float, help="run time limit in seconds")
+    args = parser.parse_args(argv)
+
+    budget = BudgetGovernor(max_steps=args.max_steps, deadline=args.deadline)
+    result, accounting = asyncio.run(run_agent(args.question, budget.attach()))
+    print(result["messages"][-1].content)
+    print(f"budget: {json.dumps(budget.report())}")
+    print(accounting.summary())
+
+
+if __name__ == "__main__":
+    main()
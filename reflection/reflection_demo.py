@@ -1,13 +1,17 @@
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
-import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 import asyncio
 
 # Load environment variables from .env
 load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.accounting import account_run
+from shared.clients import chat_model
+
 prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -19,12 +23,7 @@ prompt = ChatPromptTemplate.from_messages(
         MessagesPlaceholder(variable_name="messages"),
     ]
 )
-llm = ChatOpenAI(
-    model="deepseek-chat",
-    base_url="https://api.deepseek.com",
-    api_key=os.getenv("DEEPSEEK_API_KEY"),
-    temperature=0.0
-)
+llm = chat_model("deepseek-chat", temperature=0.0)
 generate = prompt | llm
 
 reflection_prompt = ChatPromptTemplate.from_messages(
@@ -88,21 +87,24 @@ config = {"configurable": {"thread_id": "1"}}
 
 # Wrap the async code in an async function
 async def run_graph():
-    async for event in graph.astream(
-        {
-            "messages": [
-                HumanMessage(
-                    content="Generate an essay on the topicality of The Little Prince and its message in modern life"
-                )
-            ],
-        },
-        config,
-    ):
-        print(event)
-        print("---")
+    # Per-node LLM calls, tokens and latency (generate vs reflect), printed at the end
+    with account_run() as accounting:
+        async for event in graph.astream(
+            {
+                "messages": [
+                    HumanMessage(
+                        content="Generate an essay on the topicality of The Little Prince and its message in modern life"
+                    )
+                ],
+            },
+            config,
+        ):
+            print(event)
+            print("---")
 
     state = graph.get_state(config)
     ChatPromptTemplate.from_messages(state.values["messages"]).pretty_print()
+    print(accounting.summary())
 
 # Run the async function
 if __name__ == "__main__":
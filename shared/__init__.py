@@ -0,0 +1 @@
+"""Helpers shared by the demos: pooled LLM clients, budgets and usage accounting."""
@@ -0,0 +1,219 @@
+import csv
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from .usage import extract_usage, graph_node
+
+# Label for LLM and tool calls made outside any graph node; name such calls with
+# config={"run_name": ...} to give them their own row
+OUTSIDE = "(outside graph)"
+
+FIELDS = ["node", "executions", "node_seconds", "llm_calls", "llm_errors", "cache_hits",
+          "prompt_tokens", "cached_prompt_tokens", "completion_tokens", "llm_seconds",
+          "tool_calls", "tool_errors", "tool_seconds"]
+
+
+class _NodeStats:
+    def __init__(self):
+        self.executions = 0
+        self.node_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_errors = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0  # served from the provider's prefix cache
+        self.completion_tokens = 0
+        self.llm_seconds = 0.0
+        self.tool_calls = 0
+        self.tool_errors = 0
+        self.tool_seconds = 0.0
+
+    def row(self, node) -> dict:
+        row = {"node": node}
+        row.update({field: round(value, 4) if isinstance(value, float) else value
+                    for field, value in vars(self).items()})
+        return row
+
+
+def _share(row) -> str:
+    """Fraction of prompt tokens that hit the provider's prefix cache."""
+    if not row["prompt_tokens"]:
+        return "-"
+    return f"{row['cached_prompt_tokens'] / row['prompt_tokens']:.0%}"
+
+
+def _label(metadata, name):
+    return (metadata or {}).get("langgraph_node") or name or OUTSIDE
+
+
+class RunAccounting(BaseCallbackHandler):
+    """Per-node LLM calls, tokens, latency and tool time for a run.
+
+    Node time is the wall-clock time of each node execution; LLM and tool time
+    are summed per call, so they can exceed node time when calls run in
+    parallel. Use ``account_run()`` to collect every call in a block of code,
+    or pass the handler in ``config["callbacks"]`` for a single invocation.
+    """
+
+    def __init__(self):
+        self.nodes = defaultdict(_NodeStats)
+        self.started = time.monotonic()
+        self._runs = {}  # run_id -> (label, start time)
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, label):
+        with self._lock:
+            self._runs[run_id] = (label, time.monotonic())
+
+    def _finish(self, run_id):
+        with self._lock:
+            label, start = self._runs.pop(run_id, (None, None))
+        if label is None:
+            return None, 0.0
+        return label, time.monotonic() - start
+
+    # Nodes
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, metadata=None, **kwargs):
+        node = graph_node(kwargs.get("name"), tags, metadata)
+        if node:
+            self._start(run_id, node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        node, elapsed = self._finish(run_id)
+        if node is not None:
+            with self._lock:
+                self.nodes[node].executions += 1
+                self.nodes[node].node_seconds += elapsed
+
+    on_chain_error = on_chain_end
+
+    # LLM calls
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, _label(metadata, kwargs.get("name")))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, _label(metadata, kwargs.get("name")))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        label, elapsed = self._finish(run_id)
+        if label is None:
+            return
+        usage = extract_usage(response)
+        cache_hit = any(
+            getattr(generation, "message", None) is not None
+            and generation.message.response_metadata.get("cache_hit")
+            for generations in response.generations for generation in generations)
+        with self._lock:
+            stats = self.nodes[label]
+            stats.llm_calls += 1
+            stats.cache_hits += cache_hit
+            stats.prompt_tokens += usage["prompt_tokens"]
+            stats.cached_prompt_tokens += usage["cached_prompt_tokens"]
+            stats.completion_tokens += usage["completion_tokens"]
+            stats.llm_seconds += elapsed
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        label, elapsed = self._finish(run_id)
+        if label is not None:
+            with self._lock:
+                self.nodes[label].llm_errors += 1
+                self.nodes[label].llm_seconds += elapsed
+
+    # Tools
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, _label(metadata, (serialized or {}).get("name")))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        label, elapsed = self._finish(run_id)
+        if label is not None:
+            with self._lock:
+                self.nodes[label].tool_calls += 1
+                self.nodes[label].tool_seconds += elapsed
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        label, elapsed = self._finish(run_id)
+        if label is not None:
+            with self._lock:
+                self.nodes[label].tool_errors += 1
+                self.nodes[label].tool_seconds += elapsed
+
+    # Reports
+
+    def merge(self, other: "RunAccounting"):
+        """Add another run's numbers into this one (e.g. per-question runs of a batch)."""
+        with self._lock:
+            for node, stats in other.nodes.items():
+                mine = self.nodes[node]
+                for field, value in vars(stats).items():
+                    setattr(mine, field, getattr(mine, field) + value)
+
+    def rows(self) -> list[dict]:
+        """One row per node plus a ``total`` row."""
+        with self._lock:
+            rows = [stats.row(node) for node, stats in self.nodes.items()]
+        total = {"node": "total"}
+        for field in FIELDS[1:]:
+            total[field] = round(sum(row[field] for row in rows), 4)
+        return rows + [total]
+
+    def report(self) -> dict:
+        rows = self.rows()
+        return {"elapsed_s": round(time.monotonic() - self.started, 3),
+                "nodes": {row["node"]: row for row in rows[:-1]},
+                "total": rows[-1]}
+
+    def export(self, path: str):
+        """Write the report as CSV (``.csv``) or JSON (anything else)."""
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(self.rows())
+            else:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def summary(self) -> str:
+        """Plain-text table for printing at the end of a CLI run."""
+        header = (f"{'node':<24}{'runs':>6}{'time s':>9}{'llm':>6}{'prompt':>9}{'cached':>8}"
+                  f"{'compl':>8}{'llm s':>8}{'tools':>7}{'tool s':>8}")
+        lines = [header, "-" * len(header)]
+        for row in self.rows():
+            lines.append(
+                f"{row['node'][:23]:<24}{row['executions']:>6}{row['node_seconds']:>9.2f}"
+                f"{row['llm_calls']:>6}{row['prompt_tokens']:>9}{_share(row):>8}"
+                f"{row['completion_tokens']:>8}"
+                f"{row['llm_seconds']:>8.2f}{row['tool_calls']:>7}{row['tool_seconds']:>8.2f}")
+        lines.append(f"elapsed {time.monotonic() - self.started:.2f}s")
+        return "\n".join(lines)
+
+
+_active = ContextVar("run_accounting", default=None)
+# Every callback manager configured while _active is set gets the handler, so LLM
+# and tool calls are counted without threading callbacks through each invoke
+register_configure_hook(_active, inheritable=True)
+
+
+@contextmanager
+def account_run():
+    """Collect accounting for every LangChain call made inside the block.
+
+    Threads started by LangGraph (and by code that copies the context) are
+    included; plain ``ThreadPoolExecutor.submit`` calls need
+    ``contextvars.copy_context().run``.
+    """
+    accounting = RunAccounting()
+    token = _active.set(accounting)
+    try:
+        yield accounting
+    finally:
+        _active.reset(token)
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Literal, Sequence
+
+from pydantic import Field, create_model
+
+# How long the first request of a batch waits for others to join, and the batch cap.
+# The window is added to the latency of a lone request, so batching is off (0) unless
+# requests really arrive concurrently; then keep it well below the LLM round trip.
+DEFAULT_WINDOW = float(os.environ.get("LLM_BATCH_WINDOW", 0))
+DEFAULT_MAX_BATCH = int(os.environ.get("LLM_BATCH_SIZE", 16))
+
+
+class MicroBatcher:
+    """Collect concurrent requests for a short window and resolve them together.
+
+    ``submit`` blocks the calling thread until its result is ready. The first
+    caller of a batch becomes its leader: it waits up to ``window`` seconds (less
+    if ``max_batch`` requests arrive), then calls ``resolve`` with every queued
+    item and fans the results back out. There is no background thread, so an idle
+    batcher costs nothing. With ``window <= 0`` every request is resolved on its
+    own right away.
+
+    ``resolve`` takes a list of items and returns one result per item, in order.
+    An exception from ``resolve`` is raised in every caller of that batch.
+    """
+
+    def __init__(self, resolve: Callable[[list], list], window: float = DEFAULT_WINDOW,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        self.resolve = resolve
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self._open = None  # batch still accepting requests: list of (item, future)
+        self._full = threading.Condition()
+
+    def submit(self, item):
+        future = Future()
+        if self.window <= 0:
+            self._lead([(item, future)])
+            return future.result()
+        with self._full:
+            leader = self._open is None
+            if leader:
+                self._open = []
+            batch = self._open
+            batch.append((item, future))
+            if len(batch) >= self.max_batch:
+                # the next caller starts a new batch while this one is resolved
+                self._open = None
+                self._full.notify_all()
+        if leader:
+            self._lead(batch)
+        return future.result()
+
+    def _lead(self, batch):
+        deadline = time.monotonic() + self.window
+        with self._full:
+            while self._open is batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._open = None
+                    break
+                self._full.wait(remaining)
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+
+        items = [item for item, _ in batch]
+        try:
+            results = self.resolve(items)
+            if len(results) != len(items):
+                raise ValueError(f"expected {len(items)} results, got {len(results)}")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._full:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest,
+            }
+
+
+class BatchClassifier:
+    """Classify many texts with one structured LLM call.
+
+    The model sees the texts as a JSON list and returns one label per
+    text. If it returns the wrong number of labels the texts are classified one
+    at a time instead, so a confused batch costs extra calls, never wrong
+    routing. Use ``batcher()`` to put it behind a ``MicroBatcher``.
+    """
+
+    def __init__(self, model, labels: Sequence[str], instructions: str,
+                 default: str | None = None):
+        self.labels = list(labels)
+        self.instructions = instructions
+        self.default = default
+        self.fallbacks = 0  # batches that came back with the wrong number of labels
+        self._lock = threading.Lock()
+        self._system_prompt = (
+            f"{instructions}\n"
+            f"You will receive a JSON list of messages. Classify each message on its own and "
+            f"return exactly one label per message, in the same order. "
+            f"Valid labels: {', '.join(self.labels)}.")
+        schema = create_model(
+            "Labels",
+            labels=(list[Literal[tuple(self.labels)]],
+                    Field(..., description="One label per input message, in input order.")),
+        )
+        self._model = model.with_structured_output(schema, method="function_calling")
+
+    def _prompt(self, texts):
+        # the system prompt is identical for every batch so it stays in the provider's
+        # prefix cache; the batch size goes with the texts
+        return [
+            {"role": "system", "content": self._system_prompt},
+            {"role": "user", "content": f"{len(texts)} messages:\n"
+                                        f"{json.dumps(list(texts), ensure_ascii=False)}"},
+        ]
+
+    def classify(self, texts: list[str]) -> list[str]:
+        result = self._model.invoke(self._prompt(texts))
+        if len(result.labels) == len(texts):
+            return list(result.labels)
+        if len(texts) == 1:
+            if self.default is None:
+                raise ValueError(f"expected 1 label, got {len(result.labels)}")
+            return [self.default]
+        with self._lock:
+            self.fallbacks += 1
+        return [self.classify([text])[0] for text in texts]
+
+    def batcher(self, window: float = DEFAULT_WINDOW,
+                max_batch: int = DEFAULT_MAX_BATCH) -> MicroBatcher:
+        return MicroBatcher(self.classify, window=window, max_batch=max_batch)
@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, ToolMessage
+
+from .usage import extract_usage, graph_node
+
+# Fraction of a limit at which the governor asks the graph to wrap up, leaving
+# room for the final synthesis call itself.
+DEFAULT_HEADROOM = 0.8
+
+
+class BudgetGovernor(BaseCallbackHandler):
+    """Track steps, tokens and wall-clock time for one graph run.
+
+    Attach it with ``governor.attach(config)``: it is registered as a callback,
+    so every node execution and LLM call is counted without touching the nodes,
+    and it is exposed under ``config["configurable"]["budget"]`` so routing
+    functions can call ``should_finalize()`` and send the graph to a final
+    synthesis node before a hard limit is hit.
+
+    Any limit left as ``None`` is not enforced.
+    """
+
+    def __init__(self,
+                 max_steps: Optional[int] = None,
+                 max_prompt_tokens: Optional[int] = None,
+                 max_completion_tokens: Optional[int] = None,
+                 deadline: Optional[float] = None,
+                 headroom: float = DEFAULT_HEADROOM):
+        self.max_steps = max_steps
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_completion_tokens = max_completion_tokens
+        self.deadline = deadline  # seconds from the start of the run
+        self.headroom = headroom
+        self.steps = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.finalized = False
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def attach(self, config: Optional[dict] = None) -> dict:
+        """Return a copy of ``config`` with this governor wired in."""
+        config = dict(config or {})
+        config["callbacks"] = list(config.get("callbacks") or []) + [self]
+        config["configurable"] = {**config.get("configurable", {}), "budget": self}
+        return config
+
+    # Callbacks
+
+    def on_chain_start(self, serialized, inputs, *, tags=None, metadata=None, **kwargs):
+        if graph_node(kwargs.get("name"), tags, metadata):
+            with self._lock:
+                self.steps += 1
+
+    def on_llm_end(self, response, **kwargs):
+        usage = extract_usage(response)
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+            self.cached_prompt_tokens += usage["cached_prompt_tokens"]
+
+    # Limits
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def _usage(self):
+        return [
+            ("steps", self.steps, self.max_steps),
+            ("prompt_tokens", self.prompt_tokens, self.max_prompt_tokens),
+            ("completion_tokens", self.completion_tokens, self.max_completion_tokens),
+            ("deadline", self.elapsed(), self.deadline),
+        ]
+
+    def exhausted(self) -> list[str]:
+        """Names of the limits that have been reached."""
+        return [name for name, used, limit in self._usage()
+                if limit is not None and used >= limit]
+
+    def approaching(self) -> list[str]:
+        """Names of the limits within the headroom fraction of being reached."""
+        return [name for name, used, limit in self._usage()
+                if limit is not None and used >= limit * self.headroom]
+
+    def should_finalize(self) -> bool:
+        """True once any limit is close; the graph should synthesize and stop."""
+        if self.approaching():
+            self.finalized = True
+        return self.finalized
+
+    def report(self) -> dict:
+        return {
+            "steps": self.steps,
+            "max_steps": self.max_steps,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "max_completion_tokens": self.max_completion_tokens,
+            "elapsed_s": round(self.elapsed(), 3),
+            "deadline_s": self.deadline,
+            "approaching": self.approaching(),
+            "exhausted": self.exhausted(),
+            "finalized": self.finalized,
+        }
+
+
+def get_budget(config: Optional[dict]) -> Optional[BudgetGovernor]:
+    """The governor attached to a run, if any."""
+    return ((config or {}).get("configurable") or {}).get("budget")
+
+
+def drop_pending_tool_calls(messages: list) -> list:
+    """Strip a trailing AI message whose tool calls were never answered.
+
+    Chat APIs reject a history that ends with unanswered tool calls, which is
+    exactly the state a loop is in when the budget cuts it off mid-step.
+    """
+    messages = list(messages)
+    answered = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    while messages and isinstance(messages[-1], AIMessage) and any(
+            call["id"] not in answered for call in messages[-1].tool_calls):
+        messages.pop()
+    return messages
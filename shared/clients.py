@@ -0,0 +1,146 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
+# Settings below are read from the environment when this module is imported, so
+# entry points call load_dotenv() before importing it (directly or via an agent).
+
+# OpenAI-compatible endpoints used by the demos: provider -> (base_url, API key env var)
+PROVIDERS = {
+    "deepseek": ("https://api.deepseek.com", "DEEPSEEK_API_KEY"),
+    "dashscope": ("https://dashscope.aliyuncs.com/compatible-mode/v1", "AI_DASHSCOPE_API_KEY"),
+}
+# Send every provider to one endpoint instead, e.g. the local fake server
+# (shared/fake_llm_server.py) for offline runs and benchmarks.
+BASE_URL_OVERRIDE = os.environ.get("LLM_BASE_URL")
+
+# Connection pool shared by every LLM client in the process. Agents fan out tool
+# and judge calls, so keep enough keep-alive connections for a burst to reuse.
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.environ.get("LLM_MAX_CONNECTIONS", 32)),
+    max_keepalive_connections=int(os.environ.get("LLM_MAX_KEEPALIVE", 16)),
+    keepalive_expiry=60.0,
+)
+# Generous read timeout for long completions, short connect timeout to fail fast
+TIMEOUT = httpx.Timeout(float(os.environ.get("LLM_TIMEOUT", 120)), connect=10.0)
+
+# Adaptive per-model concurrency (shared/limiter.py): starting limit, ceiling, and
+# optional per-model ceilings as "deepseek-chat=16,qwen-max=8"
+CONCURRENCY_INITIAL = int(os.environ.get("LLM_CONCURRENCY", 4))
+CONCURRENCY_MAX = int(os.environ.get("LLM_MAX_CONCURRENCY", 32))
+CONCURRENCY_PER_MODEL = {
+    model.strip(): int(limit)
+    for model, limit in (item.split("=") for item in
+                         os.environ.get("LLM_MODEL_CONCURRENCY", "").split(",") if item)
+}
+
+# Opt-in hedging of slow calls (shared/hedging.py): "same" re-sends a slow request to
+# the same model, "<provider>:<model>" to a fallback such as "dashscope:qwen-max"
+HEDGE = os.environ.get("LLM_HEDGE")
+HEDGE_INITIAL_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", 10))
+
+# Opt-in persistent response cache for temperature-0 models: set LLM_RESPONSE_CACHE
+# to a SQLite file path to enable it.
+RESPONSE_CACHE_PATH = os.environ.get("LLM_RESPONSE_CACHE")
+RESPONSE_CACHE_TTL = float(os.environ.get("LLM_RESPONSE_CACHE_TTL", 24 * 3600))
+RESPONSE_CACHE_SIZE = int(os.environ.get("LLM_RESPONSE_CACHE_SIZE", 10_000))
+
+
+@lru_cache(maxsize=None)
+def limiter():
+    """Process-wide adaptive limiter; ``limiter().snapshot()`` has per-model metrics."""
+    from .limiter import AdaptiveLimiter
+
+    return AdaptiveLimiter(initial=CONCURRENCY_INITIAL, maximum=CONCURRENCY_MAX,
+                           max_per_model=CONCURRENCY_PER_MODEL)
+
+
+@lru_cache(maxsize=None)
+def http_client() -> httpx.Client:
+    """Process-wide pooled HTTP client for synchronous LLM calls."""
+    from .limiter import LimitedTransport
+
+    transport = LimitedTransport(httpx.HTTPTransport(limits=POOL_LIMITS), limiter())
+    return httpx.Client(transport=transport, timeout=TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def http_async_client() -> httpx.AsyncClient:
+    """Process-wide pooled HTTP client for async LLM calls.
+
+    Pooled connections belong to the event loop that opened them, so use it
+    from one long-lived loop (one ``asyncio.run`` per process), as the demos do.
+    """
+    from .limiter import AsyncLimitedTransport
+
+    transport = AsyncLimitedTransport(httpx.AsyncHTTPTransport(limits=POOL_LIMITS), limiter())
+    return httpx.AsyncClient(transport=transport, timeout=TIMEOUT)
+
+
+def http_clients() -> dict:
+    """Keyword arguments that plug the shared pool into any ChatOpenAI-based model."""
+    return {"http_client": http_client(), "http_async_client": http_async_client()}
+
+
+@lru_cache(maxsize=None)
+def response_cache():
+    """The shared response cache, or None when LLM_RESPONSE_CACHE is not set."""
+    if not RESPONSE_CACHE_PATH:
+        return None
+    from .response_cache import SQLiteResponseCache
+
+    return SQLiteResponseCache(RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL,
+                               max_entries=RESPONSE_CACHE_SIZE)
+
+
+def cache_for(temperature: Optional[float]):
+    """Response cache to attach to a model, only when its output is deterministic."""
+    return response_cache() if temperature == 0 else None
+
+
+@lru_cache(maxsize=None)
+def chat_model(model: str = "deepseek-chat",
+               provider: str = "deepseek",
+               temperature: Optional[float] = None):
+    """Shared chat model for ``model`` on ``provider``.
+
+    Instances are cached per (model, provider, temperature) and all of them
+    send requests through the same connection pool, so building a model in a
+    hot path costs a dict lookup rather than a new client and TLS handshake.
+    Temperature-0 models also use the response cache when it is enabled, and
+    with LLM_HEDGE set the model is wrapped in a HedgedChatModel
+    (``chat_model(...).stats.snapshot()`` reports hedge rate and time saved).
+    """
+    base = _openai_model(model, provider, temperature)
+    if not HEDGE:
+        return base
+    from .hedging import HedgedChatModel
+
+    backup = None
+    if HEDGE != "same":
+        backup_provider, backup_model = HEDGE.split(":", 1)
+        backup = _openai_model(backup_model, backup_provider, temperature)
+    return HedgedChatModel(primary=base, backup=backup, initial_delay=HEDGE_INITIAL_DELAY)
+
+
+@lru_cache(maxsize=None)
+def _openai_model(model, provider, temperature):
+    from langchain_openai import ChatOpenAI
+
+    base_url, key_env = PROVIDERS[provider]
+    api_key = os.environ.get(key_env)
+    if BASE_URL_OVERRIDE:
+        base_url = BASE_URL_OVERRIDE
+        api_key = api_key or "local"
+    return ChatOpenAI(
+        model=model,
+        base_url=base_url,
+        api_key=api_key,
+        temperature=temperature,
+        cache=cache_for(temperature),
+        # ask for usage on streamed responses too, so budgets and accounting see it
+        stream_usage=True,
+        **http_clients(),
+    )
@@ -0,0 +1,389 @@
+"""Local stand-in for an OpenAI-compatible chat-completions endpoint.
+
+Point the demos at it with ``LLM_BASE_URL=http://127.0.0.1:8765/v1`` (see
+``shared/clients.py``) to run and benchmark graphs without keys or network.
+
+Responses are chosen in this order:
+
+1. ``script``: a list of responses served in order, one per request;
+2. ``rules``: the first rule whose conditions match the request;
+3. a generic fallback: forced tool calls and ``json_schema`` response formats
+   get a minimal valid instance of their schema, a user turn with tools offered
+   gets a call to the first tool, anything else gets a short text echo.
+
+A rules file looks like::
+
+    {
+      "script": [{"content": "first answer"}],
+      "rules": [
+        {"match": "股票", "tool": "get_financial_report", "role": "user",
+         "tool_calls": [{"name": "get_financial_report",
+                         "arguments": {"stock_codes": ["600600"]}}]},
+        {"role": "tool", "content": "分析报告……\\nFinal Answer"}
+      ]
+    }
+
+Usage blocks also report prompt prefix-cache hits the way DeepSeek does: the
+prompt (tools, then messages) is hashed in blocks of ``CACHE_BLOCK_TOKENS`` and
+every block of a prefix seen in an earlier request counts as cached.
+
+Rule conditions (all optional): ``match`` (regex searched in the last
+message), ``role`` (role of the last message), ``model`` (regex on the model
+name) and ``tool`` (a tool that must be offered). ``content`` may reference
+groups of ``match`` with ``\\1`` or ``\\g<name>``.
+
+Run with ``python -m shared.fake_llm_server --rules rules.json``.
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+# Prefix-cache granularity; DeepSeek caches prompt prefixes in 64-token units
+CACHE_BLOCK_TOKENS = 64
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def example_from_schema(schema: dict, defs: Optional[dict] = None):
+    """Smallest value that validates against a JSON schema (defaults and first enum values)."""
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    if "$ref" in schema:
+        return example_from_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "default" in schema:
+        return schema["default"]
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return example_from_schema(options[0], defs)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object" or "properties" in schema:
+        properties = schema.get("properties", {})
+        required = schema.get("required", list(properties))
+        return {name: example_from_schema(properties[name], defs)
+                for name in required if name in properties}
+    return {"array": [], "string": "", "integer": 0, "number": 0,
+            "boolean": False, "null": None}.get(kind, "")
+
+
+class Responder:
+    """Picks the response for a chat-completions request."""
+
+    def __init__(self, rules: Optional[list] = None, script: Optional[list] = None):
+        self.rules = rules or []
+        self.script = list(script or [])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config.get("rules"), config.get("script"))
+
+    def respond(self, request: dict) -> dict:
+        """Return ``{"content": str, "tool_calls": [{"name", "arguments"}]}``."""
+        with self._lock:
+            if self.script:
+                return self.script.pop(0)
+
+        messages = request.get("messages", [])
+        last = messages[-1] if messages else {}
+        last_text = _text(last.get("content"))
+        offered = [tool["function"]["name"] for tool in request.get("tools", [])]
+
+        for rule in self.rules:
+            if "role" in rule and rule["role"] != last.get("role"):
+                continue
+            if "model" in rule and not re.search(rule["model"], request.get("model", "")):
+                continue
+            if "tool" in rule and rule["tool"] not in offered:
+                continue
+            match = re.search(rule.get("match", ""), last_text)
+            if match is None:
+                continue
+            response = {key: rule[key] for key in ("content", "tool_calls") if key in rule}
+            if "content" in response:
+                response["content"] = match.expand(response["content"])
+            return response
+
+        return self.fallback(request, last, last_text)
+
+    @staticmethod
+    def fallback(request, last, last_text):
+        tools = {tool["function"]["name"]: tool["function"] for tool in request.get("tools", [])}
+        choice = request.get("tool_choice")
+        forced = None
+        if isinstance(choice, dict):
+            forced = choice.get("function", {}).get("name")
+        elif choice == "required" or (choice != "none" and tools and last.get("role") == "user"):
+            forced = next(iter(tools), None)
+        if forced in tools:
+            arguments = example_from_schema(tools[forced].get("parameters", {}))
+            return {"content": "", "tool_calls": [{"name": forced, "arguments": arguments}]}
+
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"].get("schema", {})
+            return {"content": json.dumps(example_from_schema(schema), ensure_ascii=False)}
+        if response_format.get("type") == "json_object":
+            return {"content": "{}"}
+        return {"content": f"[fake {request.get('model', 'model')}] {last_text[:200]}"}
+
+
+class FakeLLMServer:
+    """Threaded HTTP server; use ``start()``/``stop()`` or run ``serve_forever()``."""
+
+    def __init__(self, responder: Optional[Responder] = None, host="127.0.0.1", port=0,
+                 latency: float = 0.0, tokens_per_second: Optional[float] = None,
+                 max_concurrency: Optional[int] = None):
+        self.responder = responder or Responder()
+        self.latency = latency  # seconds before the first token
+        self.tokens_per_second = tokens_per_second  # None: emit instantly
+        # like a provider's rate limit: requests beyond this many in flight get a 429
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.throttled = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._prefixes = set()  # digests of prompt prefixes seen so far
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "throttled": self.throttled,
+                    "peak_in_flight": self.peak_in_flight,
+                    "prompt_tokens": self.prompt_tokens,
+                    "cached_prompt_tokens": self.cached_prompt_tokens,
+                    "completion_tokens": self.completion_tokens}
+
+    def _enter(self) -> bool:
+        with self._lock:
+            if self.max_concurrency is not None and self.in_flight >= self.max_concurrency:
+                self.throttled += 1
+                return False
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _wait_for(self, tokens):
+        if self.tokens_per_second:
+            time.sleep(tokens / self.tokens_per_second)
+
+    def _complete(self, request):
+        response = self.responder.respond(request)
+        content = response.get("content", "")
+        tool_calls = [
+            {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+             "function": {"name": call["name"],
+                          "arguments": call["arguments"] if isinstance(call["arguments"], str)
+                          else json.dumps(call["arguments"], ensure_ascii=False)}}
+            for call in response.get("tool_calls", [])]
+        prompt_tokens = sum(estimate_tokens(_text(m.get("content")))
+                            for m in request.get("messages", []))
+        if request.get("tools"):
+            prompt_tokens += estimate_tokens(json.dumps(request["tools"], ensure_ascii=False))
+        completion_tokens = estimate_tokens(content) + sum(
+            estimate_tokens(call["function"]["arguments"]) for call in tool_calls)
+        cached = min(prompt_tokens, self._prefix_cache_hit(request))
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.cached_prompt_tokens += cached
+            self.completion_tokens += completion_tokens
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens,
+                 "prompt_cache_hit_tokens": cached,
+                 "prompt_cache_miss_tokens": prompt_tokens - cached,
+                 "prompt_tokens_details": {"cached_tokens": cached}}
+        return content, tool_calls, usage
+
+    def _prefix_cache_hit(self, request) -> int:
+        """Tokens of the longest block-aligned prompt prefix seen in an earlier request."""
+        prompt = json.dumps(request.get("tools"), ensure_ascii=False) + "".join(
+            f"\n<{m.get('role')}>{_text(m.get('content'))}{json.dumps(m.get('tool_calls'))}"
+            for m in request.get("messages", []))
+        block = CACHE_BLOCK_TOKENS * 4  # characters, matching estimate_tokens
+        digest = hashlib.sha256()
+        hit = 0
+        with self._lock:
+            for start in range(0, len(prompt) - block + 1, block):
+                digest.update(prompt[start:start + block].encode())
+                # the digest covers the whole prefix, so only a repeated prefix matches
+                key = digest.copy().hexdigest()
+                if key in self._prefixes:
+                    hit = start + block
+                self._prefixes.add(key)
+        return hit // 4
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": "fake", "object": "model", "owned_by": "local"}]})
+                elif self.path.rstrip("/").endswith("/stats"):
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                if not server._enter():
+                    self._send_json(429, {"error": {"message": "rate limit exceeded",
+                                                    "type": "rate_limit_error"}})
+                    return
+                try:
+                    self._chat(request)
+                finally:
+                    server._exit()
+
+            def _chat(self, request):
+                time.sleep(server.latency)
+                content, tool_calls, usage = server._complete(request)
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                model = request.get("model", "fake")
+                finish_reason = "tool_calls" if tool_calls else "stop"
+                if request.get("stream"):
+                    self._stream(completion_id, model, content, tool_calls, usage, finish_reason,
+                                 (request.get("stream_options") or {}).get("include_usage"))
+                    return
+                server._wait_for(usage["completion_tokens"])
+                message = {"role": "assistant", "content": content}
+                if tool_calls:
+                    message["tool_calls"] = tool_calls
+                self._send_json(200, {
+                    "id": completion_id, "object": "chat.completion",
+                    "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "message": message,
+                                 "finish_reason": finish_reason}],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id, model, content, tool_calls, usage,
+                        finish_reason, include_usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def send(delta=None, finish=None, usage_block=None):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk",
+                             "created": int(time.time()), "model": model,
+                             "choices": [] if delta is None else
+                             [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                    if usage_block is not None:
+                        chunk["usage"] = usage_block
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                                     .encode("utf-8"))
+                    self.wfile.flush()
+
+                send({"role": "assistant", "content": ""})
+                # roughly one token per chunk so token-rate pacing is visible to clients
+                for piece in re.findall(r".{1,4}", content, re.S):
+                    server._wait_for(1)
+                    send({"content": piece})
+                for index, call in enumerate(tool_calls):
+                    server._wait_for(estimate_tokens(call["function"]["arguments"]))
+                    send({"tool_calls": [{"index": index, **call}]})
+                send({}, finish_reason)
+                if include_usage:
+                    send(usage_block=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible fake LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rules", help="JSON file with rules and/or a script")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float,
+                        help="output token rate (default: instant)")
+    parser.add_argument("--max-concurrency", type=int,
+                        help="answer 429 above this many concurrent requests")
+    args = parser.parse_args(argv)
+
+    responder = Responder.from_file(args.rules) if args.rules else Responder()
+    server = FakeLLMServer(responder, args.host, args.port, args.latency,
+                           args.tokens_per_second, args.max_concurrency)
+    print(f"fake LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
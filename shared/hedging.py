@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+# Requests whose primary call outlives this quantile of recent latencies get hedged
+HEDGE_QUANTILE = 0.95
+# Latency samples kept per model, and how many are needed before the quantile is trusted
+WINDOW = 200
+MIN_SAMPLES = 20
+
+# Shared by every hedged model for synchronous calls; a losing sync call cannot be
+# aborted mid-request, it finishes in the background and its result is dropped
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class HedgeStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=WINDOW)  # recent primary latencies
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.latency_saved = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self, initial: float) -> float:
+        with self._lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return initial
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_QUANTILE))]
+
+    def expected_remaining(self, elapsed: float) -> float:
+        """Mean remaining time of past primary calls that had already run ``elapsed``."""
+        with self._lock:
+            slower = [latency for latency in self.latencies if latency > elapsed]
+        return sum(slower) / len(slower) - elapsed if slower else 0.0
+
+    def record(self, primary_latency=None, hedged=False, backup_won=False, saved=0.0):
+        with self._lock:
+            self.calls += 1
+            if primary_latency is not None:
+                self.latencies.append(primary_latency)
+            if hedged:
+                self.hedged += 1
+            if backup_won:
+                self.backup_wins += 1
+                self.latency_saved += saved
+
+    def add_saved(self, seconds: float):
+        with self._lock:
+            self.latency_saved += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+                "backup_wins": self.backup_wins,
+                "latency_saved_s": round(self.latency_saved, 3),
+            }
+
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model that hedges slow calls with a duplicate request.
+
+    The primary request runs alone until it has taken longer than the p95 of
+    recent calls (``initial_delay`` until enough samples exist); then the same
+    request goes to ``backup`` (the primary itself when None, or a fallback
+    model on another endpoint) and the first successful answer wins. If one
+    side fails the other is awaited. Async calls cancel the loser; sync calls
+    abandon it.
+
+    Tools and structured output are bound through the primary model's
+    formatting, so both sides must speak the same (OpenAI) tool format.
+    Streaming goes to the primary only.
+
+    ``latency_saved_s`` is exact for sync calls (the abandoned primary is timed
+    to completion) and estimated from past primary latencies for async calls.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    primary: BaseChatModel
+    backup: Optional[BaseChatModel] = None
+    initial_delay: float = 10.0
+
+    _stats: HedgeStats = PrivateAttr(default_factory=HedgeStats)
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    @property
+    def _identifying_params(self) -> dict:
+        backup = self.backup or self.primary
+        return {"primary": self.primary._identifying_params,
+                "backup": backup._identifying_params}
+
+    @property
+    def stats(self) -> HedgeStats:
+        return self._stats
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**self.primary.bind_tools(tools, **kwargs).kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        backup = self.backup or self.primary
+        start = time.monotonic()
+
+        def call(model):
+            model_start = time.monotonic()
+            result = model._generate_with_cache(messages, stop=stop, **kwargs)
+            return result, time.monotonic() - model_start
+
+        primary = _executor.submit(call, self.primary)
+        done, _ = wait([primary], timeout=self._stats.delay(self.initial_delay))
+        if done and primary.exception() is None:
+            result, latency = primary.result()
+            self._stats.record(primary_latency=latency)
+            return result
+
+        hedge = _executor.submit(call, backup)
+        pending = {primary, hedge}
+        errors = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors[future] = future.exception()
+                    continue
+                result, _ = future.result()
+                if future is primary:
+                    self._stats.record(primary_latency=time.monotonic() - start, hedged=True)
+                else:
+                    won_at = time.monotonic() - start
+                    # the primary took at least this long; keeping that lower bound
+                    # stops the p95 from drifting down when slow calls are hedged
+                    self._stats.record(primary_latency=won_at, hedged=True, backup_won=True)
+                    if not primary.done():
+                        # time the abandoned primary to measure what the hedge saved
+                        primary.add_done_callback(lambda f: self._record_saved(f, won_at, start))
+                return result
+        raise errors.get(primary) or errors[hedge]
+
+    def _record_saved(self, primary, won_at, start):
+        if primary.exception() is None:
+            self._stats.add_saved(max(0.0, time.monotonic() - start - won_at))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        backup = self.backup or self.primary
+        start = time.monotonic()
+        primary = asyncio.ensure_future(
+            self.primary._agenerate_with_cache(messages, stop=stop, **kwargs))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self._stats.delay(self.initial_delay))
+            if done and primary.exception() is None:
+                self._stats.record(primary_latency=time.monotonic() - start)
+                return primary.result()
+
+            hedge = asyncio.ensure_future(
+                backup._agenerate_with_cache(messages, stop=stop, **kwargs))
+            tasks.append(hedge)
+            pending = set(tasks)
+            errors = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors[task] = task.exception()
+                        continue
+                    elapsed = time.monotonic() - start
+                    if task is primary:
+                        self._stats.record(primary_latency=elapsed, hedged=True)
+                    else:
+                        saved = self._stats.expected_remaining(elapsed)
+                        self._stats.record(primary_latency=elapsed, hedged=True,
+                                           backup_won=True, saved=saved)
+                    return task.result()
+            raise errors.get(primary) or errors[hedge]
+        finally:
+            # cancel the loser (or both, if the caller itself was cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        yield from self.primary._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        async for chunk in self.primary._astream(messages, stop=stop,
+                                                 run_manager=run_manager, **kwargs):
+            yield chunk
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import httpx
+
+# Status codes that mean "slow down": rate limiting and server overload
+BACKOFF_STATUS = {429, 500, 502, 503, 504}
+
+
+class _ModelLimit:
+    def __init__(self, initial, minimum, maximum):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiters = deque()
+        self.last_backoff = 0.0
+        self.baseline_latency = None  # slow-moving latency estimate
+        self.requests = 0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.latency_seconds = 0.0
+
+
+class AdaptiveLimiter:
+    """Per-model AIMD concurrency limit for LLM requests.
+
+    Every success at a saturated limit adds ``1 / limit`` (about +1 per round
+    trip of requests) as long as latency stays within ``latency_tolerance`` of
+    its baseline; a 429/5xx or transport error multiplies the limit by
+    ``backoff``, at most once per ``cooldown`` seconds so a burst of failures
+    from one window only counts once.
+
+    ``acquire``/``release`` work from threads, ``acquire_async`` from asyncio;
+    both share the same limits.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 max_per_model: Optional[dict] = None, backoff: float = 0.5,
+                 cooldown: float = 1.0, latency_tolerance: float = 2.0):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_per_model = max_per_model or {}
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.latency_tolerance = latency_tolerance
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model) -> _ModelLimit:
+        state = self._models.get(model)
+        if state is None:
+            maximum = self.max_per_model.get(model, self.maximum)
+            state = _ModelLimit(min(self.initial, maximum), self.minimum, maximum)
+            self._models[model] = state
+        return state
+
+    def _try_take(self, state) -> bool:
+        if state.in_flight < int(state.limit) and not state.waiters:
+            self._take(state)
+            return True
+        state.queued += 1
+        return False
+
+    @staticmethod
+    def _take(state):
+        state.in_flight += 1
+        state.requests += 1
+        state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+
+    def _hand_off(self, state):
+        """Give freed slots to waiters in FIFO order."""
+        while state.waiters and state.in_flight < int(state.limit):
+            wake = state.waiters.popleft()
+            self._take(state)
+            wake()
+
+    def acquire(self, model: str) -> float:
+        """Block until a slot for ``model`` is free; returns the time waited."""
+        start = time.monotonic()
+        event = threading.Event()
+        with self._lock:
+            state = self._model(model)
+            if self._try_take(state):
+                return 0.0
+            state.waiters.append(event.set)
+        event.wait()
+        waited = time.monotonic() - start
+        with self._lock:
+            state.wait_seconds += waited
+        return waited
+
+    async def acquire_async(self, model: str) -> float:
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        with self._lock:
+            state = self._model(model)
+            if self._try_take(state):
+                return 0.0
+            state.waiters.append(wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if wake in state.waiters:
+                    state.waiters.remove(wake)
+                else:
+                    # the slot was handed over just before cancellation
+                    state.in_flight -= 1
+                    self._hand_off(state)
+            raise
+        waited = time.monotonic() - start
+        with self._lock:
+            state.wait_seconds += waited
+        return waited
+
+    def release(self, model: str, latency: float, status: Optional[int] = None,
+                cancelled: bool = False):
+        """Return a slot and adapt the limit.
+
+        ``status`` None means a transport error; a cancelled request (e.g. the
+        losing side of a hedged call) frees its slot without affecting the limit.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._model(model)
+            saturated = state.in_flight >= int(state.limit)
+            state.in_flight -= 1
+            if cancelled:
+                state.cancelled += 1
+            elif status is None or status in BACKOFF_STATUS:
+                state.latency_seconds += latency
+                if status is None:
+                    state.errors += 1
+                else:
+                    state.throttled += 1
+                if now - state.last_backoff >= self.cooldown:
+                    state.limit = max(state.minimum, state.limit * self.backoff)
+                    state.last_backoff = now
+            else:
+                state.successes += 1
+                baseline = state.baseline_latency
+                state.baseline_latency = latency if baseline is None \
+                    else 0.9 * baseline + 0.1 * latency
+                healthy = baseline is None or latency <= baseline * self.latency_tolerance
+                if saturated and healthy:
+                    state.limit = min(state.maximum, state.limit + 1 / state.limit)
+            self._hand_off(state)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                model: {
+                    "limit": round(state.limit, 2),
+                    "max_limit": state.maximum,
+                    "in_flight": state.in_flight,
+                    "peak_in_flight": state.peak_in_flight,
+                    "waiting": len(state.waiters),
+                    "requests": state.requests,
+                    "successes": state.successes,
+                    "throttled": state.throttled,
+                    "errors": state.errors,
+                    "cancelled": state.cancelled,
+                    "queued": state.queued,
+                    "wait_seconds": round(state.wait_seconds, 3),
+                    "avg_latency_seconds": round(state.latency_seconds / max(
+                        1, state.successes + state.throttled + state.errors), 3),
+                }
+                for model, state in self._models.items()
+            }
+
+
+def request_model(request: httpx.Request) -> str:
+    """Model name from an OpenAI-style JSON request body."""
+    try:
+        return json.loads(request.content).get("model", "default")
+    except (ValueError, AttributeError, httpx.RequestNotRead):
+        return "default"
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+def _once(func):
+    done = False
+
+    def wrapper():
+        nonlocal done
+        if not done:
+            done = True
+            func()
+    return wrapper
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """httpx transport that holds a limiter slot from send until the response is closed."""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: AdaptiveLimiter):
+        self._transport = transport
+        self._limiter = limiter
+
+    def handle_request(self, request):
+        model = request_model(request)
+        self._limiter.acquire(model)
+        start = time.monotonic()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            self._limiter.release(model, time.monotonic() - start, None)
+            raise
+        latency = time.monotonic() - start
+        response.stream = _ReleasingStream(response.stream, _once(
+            lambda: self._limiter.release(model, latency, response.status_code)))
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AdaptiveLimiter):
+        self._transport = transport
+        self._limiter = limiter
+
+    async def handle_async_request(self, request):
+        model = request_model(request)
+        await self._limiter.acquire_async(model)
+        start = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except asyncio.CancelledError:
+            self._limiter.release(model, time.monotonic() - start, cancelled=True)
+            raise
+        except Exception:
+            self._limiter.release(model, time.monotonic() - start, None)
+            raise
+        latency = time.monotonic() - start
+        response.stream = _AsyncReleasingStream(response.stream, _once(
+            lambda: self._limiter.release(model, latency, response.status_code)))
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Hash of the model configuration and the serialized messages.
+
+    ``llm_string`` already covers the model name, sampling parameters and any
+    bound tools / response format, so identical requests map to one key.
+    """
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations) -> str:
+    rows = []
+    for generation in generations:
+        if isinstance(generation, ChatGeneration):
+            rows.append({"message": message_to_dict(generation.message),
+                         "generation_info": generation.generation_info})
+        else:
+            rows.append({"text": generation.text,
+                         "generation_info": generation.generation_info})
+    return json.dumps(rows)
+
+
+def _load_generations(payload: str) -> list:
+    generations = []
+    for row in json.loads(payload):
+        if "message" not in row:
+            generations.append(Generation(text=row["text"], generation_info=row["generation_info"]))
+            continue
+        message = messages_from_dict([row["message"]])[0]
+        # A replayed answer costs no tokens; zero the usage so budgets and
+        # accounting only count real calls, and mark where it came from.
+        if getattr(message, "usage_metadata", None):
+            message.usage_metadata = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+        message.response_metadata = {**message.response_metadata, "cache_hit": True}
+        generations.append(ChatGeneration(message=message, generation_info=row["generation_info"]))
+    return generations
+
+
+class SQLiteResponseCache(BaseCache):
+    """Persistent LangChain LLM cache with TTL and LRU size bound.
+
+    Only attach it to deterministic (temperature 0) models; see
+    ``shared.clients.chat_model``. Safe to share between threads, and between
+    processes through SQLite's own locking.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return _load_generations(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        value = _dump_generations(return_val)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed)"
+                " VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = entries - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,))
+            self.evictions += excess
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
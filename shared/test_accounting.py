@@ -0,0 +1,85 @@
+import csv
+import json
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from shared.accounting import OUTSIDE, RunAccounting, account_run
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return f"result for {query}"
+
+
+def _model(count):
+    return GenericFakeChatModel(messages=iter([
+        AIMessage(content=f"answer {i}", usage_metadata={
+            "input_tokens": 100, "output_tokens": 10, "total_tokens": 110})
+        for i in range(count)
+    ]))
+
+
+def _graph(model):
+    def think(state):
+        return {"messages": [model.invoke(state["messages"])]}
+
+    def act(state):
+        return {"messages": [HumanMessage(content=lookup.invoke({"query": "x"}))]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("think", think)
+    builder.add_node("act", act)
+    builder.add_edge(START, "think")
+    builder.add_edge("think", "act")
+    builder.add_edge("act", END)
+    return builder.compile()
+
+
+def test_attributes_llm_and_tool_calls_to_nodes():
+    model = _model(3)
+    with account_run() as accounting:
+        _graph(model).invoke({"messages": [HumanMessage(content="go")]})
+        _graph(model).invoke({"messages": [HumanMessage(content="again")]})
+        model.invoke("outside", config={"run_name": "summarize"})
+    # calls after the block are not counted
+    _graph(_model(1)).invoke({"messages": [HumanMessage(content="late")]})
+
+    report = accounting.report()
+    think, act = report["nodes"]["think"], report["nodes"]["act"]
+    assert think["executions"] == 2
+    assert think["llm_calls"] == 2
+    assert think["prompt_tokens"] == 200
+    assert think["completion_tokens"] == 20
+    assert think["tool_calls"] == 0
+    assert act["executions"] == 2
+    assert act["llm_calls"] == 0
+    assert act["tool_calls"] == 2
+    assert report["nodes"]["summarize"]["llm_calls"] == 1
+    assert OUTSIDE not in report["nodes"]
+    assert report["total"]["llm_calls"] == 3
+    assert report["total"]["prompt_tokens"] == 300
+
+
+def test_export_and_merge(tmp_path):
+    first, second = RunAccounting(), RunAccounting()
+    _graph(_model(1)).invoke({"messages": [HumanMessage(content="go")]},
+                             {"callbacks": [first]})
+    _graph(_model(1)).invoke({"messages": [HumanMessage(content="go")]},
+                             {"callbacks": [second]})
+    first.merge(second)
+    assert first.report()["nodes"]["think"]["llm_calls"] == 2
+
+    first.export(str(tmp_path / "run.json"))
+    report = json.loads((tmp_path / "run.json").read_text())
+    assert report["total"]["tool_calls"] == 2
+
+    first.export(str(tmp_path / "run.csv"))
+    with open(tmp_path / "run.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["node"] for row in rows] == ["think", "act", "total"]
+    assert rows[-1]["prompt_tokens"] == "200"
+    assert "think" in first.summary()
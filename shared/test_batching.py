@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+from langchain_openai import ChatOpenAI
+
+from shared.batching import BatchClassifier, MicroBatcher
+from shared.fake_llm_server import FakeLLMServer, Responder
+
+
+def _submit_all(batcher, items):
+    results = {}
+
+    def run(item):
+        results[item] = batcher.submit(item)
+
+    threads = [threading.Thread(target=run, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_requests_share_one_resolve_call():
+    calls = []
+
+    def resolve(items):
+        calls.append(list(items))
+        time.sleep(0.05)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(resolve, window=0.2, max_batch=16)
+    assert _submit_all(batcher, range(10)) == {i: i * 2 for i in range(10)}
+    assert len(calls) == 1
+    assert batcher.stats()["largest_batch"] == 10
+
+    capped = MicroBatcher(resolve, window=0.2, max_batch=4)
+    assert _submit_all(capped, range(10)) == {i: i * 2 for i in range(10)}
+    assert capped.stats()["batches"] >= 3
+    assert capped.stats()["largest_batch"] == 4
+
+
+def test_zero_window_resolves_each_request_without_waiting():
+    calls = []
+
+    def resolve(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(resolve, window=0)
+    start = time.monotonic()
+    assert [batcher.submit(i) for i in range(3)] == [0, 2, 4]
+    assert time.monotonic() - start < 0.05
+    assert calls == [[0], [1], [2]]
+    assert batcher.stats()["batches"] == 3
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    def resolve(items):
+        raise RuntimeError("provider down")
+
+    batcher = MicroBatcher(resolve, window=0.01)
+    with pytest.raises(RuntimeError, match="provider down"):
+        batcher.submit("a")
+
+
+def _labels(*labels):
+    return [{"name": "Labels", "arguments": {"labels": list(labels)}}]
+
+
+def test_batch_classifier_falls_back_to_single_calls():
+    responder = Responder(rules=[
+        {"match": r'messages:\n\["i feel sad", "what is 2\+2"\]$', "tool_calls": _labels("emotional", "logical")},
+        # a confused batch answer: one label for three messages
+        {"match": r'messages:\n\["i feel sad", "what is 2\+2", "hi"\]$', "tool_calls": _labels("logical")},
+        {"match": r'messages:\n\["i feel sad"\]$', "tool_calls": _labels("emotional")},
+        {"match": r'messages:\n\["what is 2\+2"\]$', "tool_calls": _labels("logical")},
+        {"match": r'messages:\n\["hi"\]$', "tool_calls": _labels("emotional")},
+    ])
+    server = FakeLLMServer(responder).start()
+    try:
+        model = ChatOpenAI(model="deepseek-chat", base_url=server.url, api_key="local")
+        classifier = BatchClassifier(model, ["emotional", "logical"], "Classify the messages.")
+
+        assert classifier.classify(["i feel sad", "what is 2+2"]) == ["emotional", "logical"]
+        assert server.stats()["requests"] == 1
+
+        assert classifier.classify(["i feel sad", "what is 2+2", "hi"]) == \
+            ["emotional", "logical", "emotional"]
+        assert classifier.fallbacks == 1
+        assert server.stats()["requests"] == 5
+    finally:
+        server.stop()
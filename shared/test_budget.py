@@ -0,0 +1,66 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from shared.budget import BudgetGovernor, drop_pending_tool_calls, get_budget
+
+
+def _llm_result(prompt_tokens, completion_tokens):
+    message = AIMessage(content="ok", usage_metadata={
+        "input_tokens": prompt_tokens,
+        "output_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    })
+    return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+def test_token_limits_trigger_finalize_before_exhaustion():
+    budget = BudgetGovernor(max_prompt_tokens=1000, headroom=0.8)
+    budget.on_llm_end(_llm_result(700, 50))
+    assert not budget.should_finalize()
+
+    budget.on_llm_end(_llm_result(150, 50))
+    assert budget.approaching() == ["prompt_tokens"]
+    assert budget.exhausted() == []
+    assert budget.should_finalize()
+
+    report = budget.report()
+    assert report["llm_calls"] == 2
+    assert report["prompt_tokens"] == 850
+    assert report["completion_tokens"] == 100
+    assert report["finalized"]
+
+
+def test_counts_graph_steps_and_routes_to_finalize():
+    def work(state):
+        return {"messages": [AIMessage(content="step")]}
+
+    def finalize(state):
+        return {"messages": [AIMessage(content="final")]}
+
+    def route(state, config):
+        return "finalize" if get_budget(config).should_finalize() else "work"
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("work", work)
+    builder.add_node("finalize", finalize)
+    builder.add_edge(START, "work")
+    builder.add_conditional_edges("work", route, ["work", "finalize"])
+    builder.add_edge("finalize", END)
+
+    budget = BudgetGovernor(max_steps=5, headroom=0.6)
+    result = builder.compile().invoke(
+        {"messages": [HumanMessage(content="go")]}, budget.attach())
+
+    assert result["messages"][-1].content == "final"
+    # work x3 reaches 60% of 5 steps, then one finalize step
+    assert budget.steps == 4
+
+
+def test_drop_pending_tool_calls():
+    call = AIMessage(content="", tool_calls=[{"name": "search", "args": {}, "id": "a"}])
+    answered = [HumanMessage(content="q"), call, ToolMessage(content="r", tool_call_id="a")]
+    assert drop_pending_tool_calls(answered) == answered
+
+    pending = AIMessage(content="", tool_calls=[{"name": "search", "args": {}, "id": "b"}])
+    assert drop_pending_tool_calls(answered + [pending]) == answered
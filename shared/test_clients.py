@@ -0,0 +1,42 @@
+from shared import clients
+from shared.clients import POOL_LIMITS, chat_model, http_async_client, http_client
+
+
+def test_chat_model_is_shared_per_configuration(monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    chat_model.cache_clear()
+    clients._openai_model.cache_clear()
+
+    assert chat_model("deepseek-chat", temperature=0.0) is chat_model("deepseek-chat", temperature=0.0)
+    assert chat_model("deepseek-chat") is not chat_model("deepseek-chat", temperature=0.0)
+
+
+def test_models_use_the_shared_pool(monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setenv("AI_DASHSCOPE_API_KEY", "test-key")
+    chat_model.cache_clear()
+    clients._openai_model.cache_clear()
+
+    deepseek = chat_model("deepseek-chat")
+    qwen = chat_model("qwen-max", provider="dashscope")
+    for model in (deepseek, qwen):
+        assert model.root_client._client is http_client()
+        assert model.root_async_client._client is http_async_client()
+    assert qwen.openai_api_base.startswith("https://dashscope")
+    pool = http_client()._transport._transport._pool
+    assert pool._max_connections == POOL_LIMITS.max_connections
+
+
+def test_response_cache_only_for_deterministic_models(monkeypatch, tmp_path):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setattr(clients, "RESPONSE_CACHE_PATH", str(tmp_path / "responses.sqlite"))
+    clients.response_cache.cache_clear()
+    chat_model.cache_clear()
+    clients._openai_model.cache_clear()
+    try:
+        assert chat_model("deepseek-chat", temperature=0.0).cache is clients.response_cache()
+        assert chat_model("deepseek-chat").cache is None
+    finally:
+        clients.response_cache.cache_clear()
+        chat_model.cache_clear()
+        clients._openai_model.cache_clear()
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+from typing import Literal
+
+from shared.fake_llm_server import FakeLLMServer, Responder, example_from_schema
+
+
+@pytest.fixture
+def server():
+    responder = Responder(rules=[
+        {"match": r"price of (?P<code>\d{6})", "role": "user", "tool": "get_price",
+         "tool_calls": [{"name": "get_price", "arguments": {"code": "600600"}}]},
+        {"role": "tool", "content": "the price is fine\nFinal Answer"},
+        {"match": r"hello (\w+)", "content": r"hi \1"},
+    ])
+    server = FakeLLMServer(responder).start()
+    yield server
+    server.stop()
+
+
+def _model(server):
+    return ChatOpenAI(model="deepseek-chat", base_url=server.url, api_key="local")
+
+
+def get_price(code: str) -> str:
+    """Latest price for a stock code."""
+    return "10.0"
+
+
+def test_rules_text_and_tool_calls(server):
+    model = _model(server)
+    assert model.invoke("hello world").content == "hi world"
+
+    with_tools = model.bind_tools([get_price])
+    call = with_tools.invoke("what is the price of 600600?")
+    assert call.tool_calls[0]["name"] == "get_price"
+    assert call.tool_calls[0]["args"] == {"code": "600600"}
+
+    answer = with_tools.invoke([
+        HumanMessage(content="what is the price of 600600?"), call,
+        ToolMessage(content="10.0", tool_call_id=call.tool_calls[0]["id"])])
+    assert answer.content.endswith("Final Answer")
+    assert answer.usage_metadata["output_tokens"] > 0
+    assert server.stats()["requests"] == 3
+
+
+def test_structured_output_and_streaming(server):
+    class Label(BaseModel):
+        message_type: Literal["emotional", "logical"]
+
+    model = _model(server)
+    assert model.with_structured_output(Label).invoke("classify me").message_type == "emotional"
+    assert model.with_structured_output(Label, method="function_calling") \
+        .invoke("classify me").message_type == "emotional"
+
+    chunks = [chunk.content for chunk in model.stream("hello streaming world")]
+    assert len(chunks) > 2
+    assert "".join(chunks) == "hi streaming"
+
+
+def test_script_is_served_in_order():
+    responder = Responder(script=[{"content": "one"}, {"content": "two"}])
+    request = {"messages": [{"role": "user", "content": "x"}]}
+    assert [responder.respond(request)["content"] for _ in range(3)] == \
+        ["one", "two", "[fake model] x"]
+
+
+def test_example_from_schema():
+    schema = {"type": "object", "required": ["steps"], "properties": {
+        "steps": {"type": "array", "items": {"$ref": "#/$defs/Step"}},
+        "note": {"type": "string"}},
+        "$defs": {"Step": {"type": "object"}}}
+    assert example_from_schema(schema) == {"steps": []}
+    assert json.loads(json.dumps(example_from_schema(
+        {"anyOf": [{"type": "null"}, {"type": "integer"}]}))) == 0
+
+
+def test_prefix_cache_hits_are_reported(server):
+    from shared.accounting import RunAccounting
+
+    model = _model(server)
+    static = "You are a careful assistant. " * 60
+    accounting = RunAccounting()
+    config = {"callbacks": [accounting]}
+    model.invoke([("system", static), ("user", "first question")], config)
+    model.invoke([("system", static), ("user", "second question")], config)
+    # variable content ahead of the static instructions defeats the cache
+    model.invoke([("system", "third question\n" + static)], config)
+
+    row = accounting.report()["nodes"]["(outside graph)"]
+    cached = server.stats()["cached_prompt_tokens"]
+    assert cached >= 256
+    assert row["cached_prompt_tokens"] == cached
+    assert row["cached_prompt_tokens"] < row["prompt_tokens"] / 2
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Literal
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from shared.fake_llm_server import FakeLLMServer
+from shared.hedging import HedgedChatModel
+
+
+class SleepyModel(BaseChatModel):
+    name: str
+    delay: float
+    calls: int = 0
+    finished: int = 0
+
+    @property
+    def _llm_type(self):
+        return "sleepy"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        self.finished += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.name))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.name))])
+
+
+def test_fast_primary_is_not_hedged():
+    backup = SleepyModel(name="backup", delay=0)
+    model = HedgedChatModel(primary=SleepyModel(name="primary", delay=0), backup=backup,
+                            initial_delay=0.5)
+    assert model.invoke("hi").content == "primary"
+    assert backup.calls == 0
+    assert model.stats.snapshot()["hedge_rate"] == 0
+
+
+def test_slow_primary_is_hedged_sync():
+    model = HedgedChatModel(primary=SleepyModel(name="primary", delay=0.4),
+                            backup=SleepyModel(name="backup", delay=0.01), initial_delay=0.05)
+    start = time.monotonic()
+    assert model.invoke("hi").content == "backup"
+    assert time.monotonic() - start < 0.3
+
+    time.sleep(0.5)  # the abandoned primary finishes and is timed
+    stats = model.stats.snapshot()
+    assert stats["hedged"] == 1 and stats["backup_wins"] == 1
+    assert 0.2 < stats["latency_saved_s"] < 0.4
+
+
+def test_slow_primary_is_cancelled_async():
+    primary = SleepyModel(name="primary", delay=0.4)
+    model = HedgedChatModel(primary=primary, backup=SleepyModel(name="backup", delay=0.01),
+                            initial_delay=0.05)
+
+    async def run():
+        result = await model.ainvoke("hi")
+        await asyncio.sleep(0.5)
+        return result
+
+    assert asyncio.run(run()).content == "backup"
+    assert primary.calls == 1 and primary.finished == 0
+
+
+def test_structured_output_hedges_to_fallback_endpoint():
+    class Label(BaseModel):
+        message_type: Literal["emotional", "logical"]
+
+    slow = FakeLLMServer(latency=1.0).start()
+    fast = FakeLLMServer().start()
+    try:
+        model = HedgedChatModel(
+            primary=ChatOpenAI(model="deepseek-chat", base_url=slow.url, api_key="local"),
+            backup=ChatOpenAI(model="qwen-max", base_url=fast.url, api_key="local"),
+            initial_delay=0.1)
+
+        async def run():
+            return await model.with_structured_output(Label).ainvoke("classify me")
+
+        start = time.monotonic()
+        assert asyncio.run(run()).message_type == "emotional"
+        assert time.monotonic() - start < 0.8
+        assert fast.stats()["requests"] == 1
+    finally:
+        slow.stop()
+        fast.stop()
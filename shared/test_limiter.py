@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import httpx
+
+from shared.fake_llm_server import FakeLLMServer
+from shared.limiter import AdaptiveLimiter, AsyncLimitedTransport, LimitedTransport
+
+
+def test_additive_increase_and_multiplicative_backoff():
+    limiter = AdaptiveLimiter(initial=2, maximum=4, cooldown=0)
+
+    def round_trip(n):
+        for _ in range(n):
+            limiter.acquire("m")
+        for _ in range(n):
+            limiter.release("m", 0.1, 200)
+
+    # only a limit that is actually used grows
+    round_trip(1)
+    assert limiter.snapshot()["m"]["limit"] == 2
+    for _ in range(10):
+        round_trip(int(limiter.snapshot()["m"]["limit"]))
+    assert limiter.snapshot()["m"]["limit"] == 4  # capped at the maximum
+
+    limiter.acquire("m")
+    limiter.release("m", 0.1, 429)
+    snapshot = limiter.snapshot()["m"]
+    assert snapshot["limit"] == 2
+    assert snapshot["throttled"] == 1
+
+    # cancellation frees the slot without touching the limit
+    limiter.acquire("m")
+    limiter.release("m", 0.1, cancelled=True)
+    assert limiter.snapshot()["m"]["limit"] == 2
+    assert limiter.snapshot()["m"]["in_flight"] == 0
+
+
+def test_limits_are_per_model_and_block_when_full():
+    limiter = AdaptiveLimiter(initial=1, max_per_model={"small": 1})
+    limiter.acquire("small")
+    limiter.acquire("other")  # a different model has its own slot
+
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire("small"), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release("small", 0.01, 200)
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.snapshot()["small"]["queued"] == 1
+
+
+def test_sync_transport_releases_on_close():
+    server = FakeLLMServer().start()
+    limiter = AdaptiveLimiter(initial=1)
+    try:
+        with httpx.Client(transport=LimitedTransport(httpx.HTTPTransport(), limiter)) as client:
+            for _ in range(3):
+                response = client.post(f"{server.url}/chat/completions", json={
+                    "model": "fake-model", "messages": [{"role": "user", "content": "hi"}]})
+                assert response.status_code == 200
+        snapshot = limiter.snapshot()["fake-model"]
+        assert snapshot["successes"] == 3
+        assert snapshot["in_flight"] == 0
+    finally:
+        server.stop()
+
+
+def test_backs_off_under_provider_rate_limit():
+    server = FakeLLMServer(latency=0.05, max_concurrency=3).start()
+    limiter = AdaptiveLimiter(initial=8, maximum=16, cooldown=0.05)
+
+    async def run():
+        transport = AsyncLimitedTransport(httpx.AsyncHTTPTransport(), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            async def call():
+                while True:
+                    response = await client.post(f"{server.url}/chat/completions", json={
+                        "model": "deepseek-chat",
+                        "messages": [{"role": "user", "content": "hi"}]})
+                    if response.status_code == 200:
+                        return
+            await asyncio.gather(*(call() for _ in range(40)))
+
+    try:
+        asyncio.run(run())
+        snapshot = limiter.snapshot()["deepseek-chat"]
+        assert snapshot["successes"] == 40
+        assert snapshot["throttled"] > 0
+        assert snapshot["limit"] < 8
+        assert server.stats()["peak_in_flight"] <= 3
+    finally:
+        server.stop()
@@ -0,0 +1,58 @@
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+
+from shared.response_cache import SQLiteResponseCache
+
+
+def _model(cache, responses):
+    return FakeMessagesListChatModel(cache=cache, responses=[
+        AIMessage(content=text, usage_metadata={
+            "input_tokens": 10, "output_tokens": 2, "total_tokens": 12})
+        for text in responses])
+
+
+def test_repeated_prompt_is_served_from_disk(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    model = _model(SQLiteResponseCache(path), ["first", "second"])
+
+    assert model.invoke("classify: hello").content == "first"
+    cached = model.invoke("classify: hello")
+    assert cached.content == "first"
+    assert cached.usage_metadata["input_tokens"] == 0
+    assert cached.response_metadata["cache_hit"]
+    assert model.invoke("classify: other").content == "second"
+
+    # a new process (new cache object) sees the stored answers
+    reopened = SQLiteResponseCache(path)
+    assert _model(reopened, ["fresh"]).invoke("classify: hello").content == "first"
+    assert reopened.stats()["hits"] == 1
+
+
+def test_tools_are_part_of_the_key(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"))
+    model = _model(cache, ["plain", "with tools"])
+
+    assert model.invoke("hi").content == "plain"
+    assert model.bind(tools=[{"type": "function", "function": {"name": "search"}}]) \
+        .invoke("hi").content == "with tools"
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"), ttl=0.05, max_entries=2)
+    model = _model(cache, ["a", "b", "c", "d"])
+
+    model.invoke("one")
+    model.invoke("two")
+    model.invoke("three")
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+
+    time.sleep(0.1)
+    assert model.invoke("three").content == "d"
+    stats = cache.stats()
+    assert stats["expired"] == 1
+    assert stats["hits"] == 0
+    assert stats["hit_rate"] == 0.0
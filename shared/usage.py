@@ -0,0 +1,60 @@
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+
+def _cached_tokens(token_usage: dict) -> int:
+    """Prompt tokens served from the provider's prefix cache, from a raw usage block.
+
+    DeepSeek reports ``prompt_cache_hit_tokens``; OpenAI-style providers (and
+    DashScope's compatible mode) report ``prompt_tokens_details.cached_tokens``.
+    """
+    if "prompt_cache_hit_tokens" in token_usage:
+        return token_usage["prompt_cache_hit_tokens"] or 0
+    return (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+
+
+def extract_usage(response: LLMResult) -> dict:
+    """Return prompt/completion token counts reported for one LLM call.
+
+    Prefers the per-message ``usage_metadata`` and falls back to the raw
+    ``token_usage`` block that OpenAI-compatible providers put in ``llm_output``.
+    ``cached_prompt_tokens`` is the part of the prompt that hit the provider's
+    prefix cache.
+    """
+    prompt_tokens = completion_tokens = cached_prompt_tokens = 0
+    found = False
+    for generations in response.generations:
+        for generation in generations:
+            if not isinstance(generation, ChatGeneration):
+                continue
+            usage = getattr(generation.message, "usage_metadata", None)
+            if usage:
+                found = True
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                cached = (usage.get("input_token_details") or {}).get("cache_read")
+                if cached is None:
+                    token_usage = generation.message.response_metadata.get("token_usage") or {}
+                    cached = _cached_tokens(token_usage)
+                cached_prompt_tokens += cached
+
+    if not found:
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens", 0)
+        completion_tokens = token_usage.get("completion_tokens", 0)
+        cached_prompt_tokens = _cached_tokens(token_usage)
+
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens}
+
+
+def graph_node(name, tags, metadata):
+    """Node name when a chain-start callback is a LangGraph node itself, else None.
+
+    A node shows up as a chain named after its node and tagged with the
+    superstep; runnables nested inside the node share its metadata but carry
+    other names and tags.
+    """
+    node = (metadata or {}).get("langgraph_node")
+    if node and name == node and any(tag.startswith("graph:step:") for tag in tags or []):
+        return node
+    return None